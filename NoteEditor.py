@@ -1,40 +1,195 @@
+import asyncio
+import difflib
+import re
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.widget import Widget
 from textual.widgets import TextArea, Markdown
-from textual.containers import Vertical
+from textual.containers import Vertical, VerticalScroll
 from textual.reactive import reactive
 
+
+_FENCE = re.compile(r"(`{3,}|~{3,})")
+_LIST_ITEM = re.compile(r" {0,3}(?:[-+*]|\d{1,9}[.)])(?:[ \t]|$)")
+_LINK_DEFINITION = re.compile(r" {0,3}\[[^\]]+\]:")
+
+
+def split_blocks(text: str) -> list[str]:
+    """
+    Split Markdown into top-level blocks at blank lines, where each block
+    renders on its own as it would in the whole text: fenced code stays
+    together (a fence closes only on the same character, at least as long),
+    indented continuation blocks (nested list items, indented code) fold
+    into the block before them, and the items of a loose list stay one
+    block. Link reference definitions are appended to every block that may
+    use them.
+    """
+    blocks: list[str] = []
+    current: list[str] = []
+    definitions: list[str] = []
+    fence = None
+    in_list = False  # The last finished block is a list
+    for line in text.splitlines(keepends=True):
+        stripped = line.lstrip()
+        if fence is not None:
+            current.append(line)
+            if stripped.startswith(fence) and not stripped.rstrip().lstrip(fence[0]):
+                fence = None
+            continue
+        if not stripped:
+            if current:
+                blocks.append("".join(current))
+                in_list = bool(_LIST_ITEM.match(current[0]))
+                current = []
+            continue
+        if not current and blocks and (line[:1] in (" ", "\t") or in_list and _LIST_ITEM.match(line)):
+            current = [blocks.pop(), "\n"]
+        match = _FENCE.match(stripped)
+        if match:
+            fence = match.group(1)
+        elif _LINK_DEFINITION.match(line):
+            definitions.append(line if line.endswith("\n") else line + "\n")
+        current.append(line)
+    if current:
+        blocks.append("".join(current))
+    if definitions:
+        suffix = "\n" + "".join(definitions)
+        blocks = [block + suffix if "]" in block else block for block in blocks]
+    return blocks
+
+
+def plan_blocks(old: list[str], text: str) -> tuple[list[str], list[tuple[str, int, int, int, int]]]:
+    """Split ``text`` and diff its blocks against ``old``; returns (blocks, opcodes)."""
+    new = split_blocks(text)
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return new, matcher.get_opcodes()
+
+
 class NoteEditor(Widget):
+    """
+    Note text with an editor view and a rendered Markdown view.
+
+    Both views stay mounted and toggling only flips which one is displayed,
+    so the editor keeps its cursor and undo history. The Markdown view is a
+    column of one ``Markdown`` widget per block; re-rendering diffs the
+    blocks against the previous render and only rebuilds the ones that
+    changed.
+    """
+
+    DEFAULT_CSS = """
+    NoteEditor #note-markdown {
+        height: 1fr;
+    }
+    NoteEditor #note-markdown Markdown {
+        margin: 0;
+        padding: 0 1;
+    }
+    """
+
+    # Notes longer than this are split and diffed on a thread.
+    THREAD_THRESHOLD = 20_000
+    # Block widgets mounted per step, so first render of a long note stays responsive.
+    MOUNT_BATCH = 50
+
     view_markdown = reactive(False)
     _content = reactive("")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._blocks: list[str] = []
+        self._block_widgets: list[Markdown] = []
+
     def compose(self) -> ComposeResult:
         self.notes_container = Vertical(id="notes-container")
-        yield self.notes_container
+        with self.notes_container:
+            yield TextArea(self._content, id="note-text")
+            yield VerticalScroll(id="note-markdown")
+
+    def on_mount(self):
+        self._apply_view()
 
     def toggle_view_markdown(self):
         self.view_markdown = not self.view_markdown
-        
 
     def update_content(self, content: str):
         self._content = content
-        self.notes_container.remove_children()
+        if not self.is_mounted:
+            return
+        self.query_one("#note-text", TextArea).load_text(content)
         if self.view_markdown:
-            self.notes_container.mount(Markdown(content))
-        else:
-            ta = TextArea()
-            ta.load_text(content)
-            self.notes_container.mount(ta)
+            self._render_markdown(content)
 
     def get_content(self) -> str:
-        self._content = self.notes_container.query_one(TextArea).text
+        editors = self.query("#note-text")
+        if editors:
+            self._content = editors.first(TextArea).text
         return self._content
 
     def watch_view_markdown(self, view_markdown: bool):
-        if len(self.notes_container.children) > 0:
-            if  view_markdown:
-                self._content = self.notes_container.children[0].text
-            self.update_content(self._content)
+        if self.is_mounted:
+            self._apply_view()
+
+    def _apply_view(self):
+        editor = self.query_one("#note-text", TextArea)
+        preview = self.query_one("#note-markdown", VerticalScroll)
+        if self.view_markdown:
+            self._render_markdown(self.get_content())
+        editor.display = not self.view_markdown
+        preview.display = self.view_markdown
+        (preview if self.view_markdown else editor).focus()
+
+    @work(exclusive=True, group="note-markdown")
+    async def _render_markdown(self, text: str):
+        """Bring the Markdown view up to date with ``text``, rebuilding changed blocks only."""
+        if len(text) > self.THREAD_THRESHOLD:
+            blocks, opcodes = await asyncio.to_thread(plan_blocks, self._blocks, text)
+        else:
+            blocks, opcodes = plan_blocks(self._blocks, text)
+        old_widgets = self._block_widgets
+        if all(tag == "equal" for tag, *_ in opcodes) and all(w.is_attached for w in old_widgets):
+            return
+        container = self.query_one("#note-markdown", VerticalScroll)
+        widgets: list[Markdown] = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                widgets.extend(old_widgets[i1:i2])
+            else:
+                widgets.extend(Markdown(block) for block in blocks[j1:j2])
+        # Commit the new state before awaiting, so a newer render diffs
+        # against it even if this one is cancelled part-way; anything it
+        # left mounted but unused is removed below.
+        self._blocks = blocks
+        self._block_widgets = widgets
+        keep = set(widgets)
+        stale = [child for child in container.children if child not in keep]
+        if stale:
+            await container.remove_children(stale)
+        previous = None
+        pending: list[Markdown] = []
+
+        async def flush():
+            if not pending:
+                return
+            if previous is not None:
+                await container.mount_all(pending, after=previous)
+            elif container.children:
+                await container.mount_all(pending, before=0)
+            else:
+                await container.mount_all(pending)
+            pending.clear()
+
+        for widget in widgets:
+            if widget.is_attached:
+                await flush()
+                previous = widget
+                continue
+            pending.append(widget)
+            if len(pending) >= self.MOUNT_BATCH:
+                batch_last = pending[-1]
+                await flush()
+                previous = batch_last
+        await flush()
 
 class NoteEditorApp(App):
     def compose(self) -> ComposeResult:
@@ -0,0 +1,339 @@
+import heapq
+from typing import Iterable
+
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from rich.cells import cell_len
+from rich.segment import Segment
+from metrics import metrics
+
+
+class ProblemList(ScrollView, can_focus=True):
+    """
+    Virtualized list of problems keyed by problem id.
+
+    Rows are plain data rather than widgets: only the lines inside the
+    visible window are rendered, and ``set_rows`` diffs against the current
+    rows so unchanged lines are left alone.
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("enter", "select", "Open", show=False),
+    ]
+
+    COMPONENT_CLASSES = {"problem-list--cursor", "problem-list--match"}
+
+    # Markers that wrap matched terms in search snippets (see search_problems).
+    HIGHLIGHT = ("\x02", "\x03")
+    _UNMARK = str.maketrans("", "", "".join(HIGHLIGHT))
+
+    DEFAULT_CSS = """
+    ProblemList {
+        height: 1fr;
+    }
+    ProblemList > .problem-list--cursor {
+        background: $accent;
+        color: $text;
+    }
+    ProblemList > .problem-list--match {
+        text-style: bold underline;
+    }
+    """
+
+    cursor = reactive(0, always_update=True)
+
+    class Selected(Message):
+        """Posted when a row is activated with Enter or a click."""
+
+        def __init__(self, problem_list: "ProblemList", problem_id: int) -> None:
+            super().__init__()
+            self.problem_list = problem_list
+            self.problem_id = problem_id
+
+        @property
+        def control(self) -> "ProblemList":
+            return self.problem_list
+
+    class NearEnd(Message):
+        """Posted once per row count when the view approaches the last row."""
+
+        def __init__(self, problem_list: "ProblemList") -> None:
+            super().__init__()
+            self.problem_list = problem_list
+
+        @property
+        def control(self) -> "ProblemList":
+            return self.problem_list
+
+    def __init__(self, *, name: str | None = None, id: str | None = None,
+                 classes: str | None = None) -> None:
+        super().__init__(name=name, id=id, classes=classes)
+        self._order: list[int] = []
+        self._index: dict[int, int] = {}
+        self._rows: dict[int, tuple] = {}
+        self._widths: dict[int, int] = {}  # Cell width of each formatted row
+        self._width = 0
+        self._near_end_posted_at = -1
+
+    @staticmethod
+    def format_row(row: tuple) -> str:
+        """Render ``(id, name, grp, solved)`` with an optional trailing search snippet."""
+        _, name, grp, solved = row[:4]
+        mark = "✓" if solved else "✗"
+        text = f"{mark} {grp} / {name}"
+        if len(row) > 4 and row[4]:
+            snippet = " ".join(row[4].split())
+            text += f"  — {snippet}"
+        return text
+
+    def _segments(self, text: str, style) -> list[Segment]:
+        """Split ``text`` on HIGHLIGHT markers into plain and matched segments."""
+        start, end = self.HIGHLIGHT
+        if start not in text:
+            return [Segment(text, style)]
+        match_style = style + self.get_component_rich_style("problem-list--match")
+        segments = []
+        for i, part in enumerate(text.split(start)):
+            if i == 0:
+                segments.append(Segment(part, style))
+                continue
+            hit, _, rest = part.partition(end)
+            segments.append(Segment(hit, match_style))
+            segments.append(Segment(rest, style))
+        return segments
+
+    @property
+    def row_count(self) -> int:
+        return len(self._order)
+
+    @property
+    def last_id(self) -> int | None:
+        return self._order[-1] if self._order else None
+
+    @property
+    def highlighted_id(self) -> int | None:
+        if 0 <= self.cursor < len(self._order):
+            return self._order[self.cursor]
+        return None
+
+    def set_rows(self, rows: list[tuple]) -> None:
+        """
+        Replace the displayed rows with ``rows`` (``(id, name, grp, solved)``).
+
+        Only the lines whose content changed are repainted; if the set or the
+        order of ids changed the virtual size is recomputed instead.
+        """
+        with metrics.timer("ui.set_rows"):
+            self._set_rows(rows)
+
+    def _set_rows(self, rows: list[tuple]) -> None:
+        new_order = [row[0] for row in rows]
+        new_rows = {row[0]: tuple(row) for row in rows}
+        old_rows = self._rows
+        changed = [row for pid, row in new_rows.items() if old_rows.get(pid) != row]
+        if new_order == self._order:
+            self._rows = new_rows
+            for row in changed:
+                self._refresh_row(self._index[row[0]])
+            if changed:
+                self._update_virtual_size(changed)
+            return
+        current = self.highlighted_id
+        self._order = new_order
+        self._rows = new_rows
+        self._index = {pid: i for i, pid in enumerate(new_order)}
+        self._update_virtual_size(changed, [pid for pid in old_rows if pid not in new_rows])
+        if current is not None and current in self._index:
+            self.cursor = self._index[current]
+        else:
+            self.cursor = min(self.cursor, max(len(new_order) - 1, 0))
+        self.refresh()
+        self._check_near_end()
+
+    def append_rows(self, rows: list[tuple]) -> None:
+        """Append a page of rows after the current last row."""
+        if not rows:
+            return
+        added = []
+        for row in rows:
+            pid = row[0]
+            if pid in self._index:
+                continue
+            self._index[pid] = len(self._order)
+            self._order.append(pid)
+            self._rows[pid] = tuple(row)
+            added.append(self._rows[pid])
+        if not added:
+            return
+        self._update_virtual_size(added)
+        self.refresh()
+        self._check_near_end()
+
+    def _check_near_end(self) -> None:
+        if not self.is_mounted or not self._order:
+            return
+        bottom = self.scroll_offset.y + self.size.height
+        threshold = max(self.size.height, 1)
+        near = bottom + threshold >= len(self._order) or self.cursor + threshold >= len(self._order)
+        if near and self._near_end_posted_at != len(self._order):
+            self._near_end_posted_at = len(self._order)
+            self.post_message(self.NearEnd(self))
+
+    def apply_rows(self, rows: Iterable[tuple], removed: Iterable[int] = ()) -> None:
+        """
+        Apply a batch of changes in one pass: each of ``rows`` is updated in
+        place or inserted keeping ids in descending order, and the ids in
+        ``removed`` are dropped.
+        """
+        with metrics.timer("ui.apply_rows"):
+            self._apply_rows(rows, removed)
+
+    def _apply_rows(self, rows: Iterable[tuple], removed: Iterable[int]) -> None:
+        removed = {pid for pid in removed if pid in self._index}
+        updated: list[tuple] = []
+        inserted: dict[int, tuple] = {}
+        for row in map(tuple, rows):
+            pid = row[0]
+            if pid in removed:
+                continue
+            if pid not in self._index:
+                inserted[pid] = row
+            elif self._rows[pid] != row:
+                self._rows[pid] = row
+                updated.append(row)
+        if not removed and not inserted:
+            for row in updated:
+                self._refresh_row(self._index[row[0]])
+            if updated:
+                self._update_virtual_size(updated)
+            return
+        current = self.highlighted_id
+        order = self._order
+        if removed:
+            order = [pid for pid in order if pid not in removed]
+            for pid in removed:
+                del self._rows[pid]
+        if inserted:
+            self._rows.update(inserted)
+            order = list(heapq.merge(order, sorted(inserted, reverse=True), reverse=True))
+        self._order = order
+        self._index = {pid: i for i, pid in enumerate(order)}
+        self._update_virtual_size(updated + list(inserted.values()), removed)
+        if current is not None and current in self._index:
+            self.cursor = self._index[current]
+        else:
+            self.cursor = min(self.cursor, max(len(order) - 1, 0))
+        self.refresh()
+        self._check_near_end()
+
+    def upsert_row(self, row: tuple) -> None:
+        """Update a row in place, or insert it keeping ids in descending order."""
+        self.apply_rows([row])
+
+    def remove_row(self, problem_id: int) -> None:
+        self.apply_rows([], [problem_id])
+
+    def clear(self) -> None:
+        self.set_rows([])
+
+    def _update_virtual_size(self, changed: Iterable[tuple] = (), removed: Iterable[int] = ()) -> None:
+        """
+        Measure only the ``changed`` rows and forget ``removed`` ones; the
+        widest row is looked up again only when it went away or got narrower.
+        """
+        widths = self._widths
+        widest = self._width
+        stale = False
+        for pid in removed:
+            if widths.pop(pid, 0) >= widest:
+                stale = True
+        for row in changed:
+            width = cell_len(self.format_row(row).translate(self._UNMARK))
+            if widths.get(row[0], 0) >= widest > width:
+                stale = True
+            widths[row[0]] = width
+            widest = max(widest, width)
+        if stale:
+            widest = max(widths.values(), default=0)
+        self._width = widest
+        self.virtual_size = Size(widest, len(self._order))
+
+    def _refresh_row(self, index: int) -> None:
+        y = index - self.scroll_offset.y
+        if 0 <= y < self.size.height:
+            self.refresh(Region(0, y, self.size.width, 1))
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        if index >= len(self._order):
+            return Strip.blank(self.size.width, self.rich_style)
+        text = self.format_row(self._rows[self._order[index]])
+        if index == self.cursor and self.has_focus:
+            style = self.get_component_rich_style("problem-list--cursor")
+        else:
+            style = self.rich_style
+        width = max(self.size.width, self.virtual_size.width)
+        strip = Strip(self._segments(text, style)).adjust_cell_length(width, style)
+        return strip.crop(scroll_x, scroll_x + self.size.width)
+
+    def watch_cursor(self, old: int, new: int) -> None:
+        self._refresh_row(old)
+        self._refresh_row(new)
+        self.scroll_to_region(Region(0, new, 1, 1), animate=False)
+        self._check_near_end()
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._check_near_end()
+
+    def on_resize(self) -> None:
+        self._check_near_end()
+
+    def on_focus(self) -> None:
+        self._refresh_row(self.cursor)
+
+    def on_blur(self) -> None:
+        self._refresh_row(self.cursor)
+
+    def on_click(self, event: events.Click) -> None:
+        index = event.y + self.scroll_offset.y
+        if 0 <= index < len(self._order):
+            self.cursor = index
+            self.action_select()
+
+    def action_cursor_up(self) -> None:
+        if self.cursor > 0:
+            self.cursor -= 1
+
+    def action_cursor_down(self) -> None:
+        if self.cursor < len(self._order) - 1:
+            self.cursor += 1
+
+    def action_page_up(self) -> None:
+        self.cursor = max(self.cursor - max(self.size.height, 1), 0)
+
+    def action_page_down(self) -> None:
+        self.cursor = min(self.cursor + max(self.size.height, 1), max(len(self._order) - 1, 0))
+
+    def action_first(self) -> None:
+        self.cursor = 0
+
+    def action_last(self) -> None:
+        self.cursor = max(len(self._order) - 1, 0)
+
+    def action_select(self) -> None:
+        pid = self.highlighted_id
+        if pid is not None:
+            self.post_message(self.Selected(self, pid))
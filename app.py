@@ -1,22 +1,201 @@
 # app.py
+import sys
+import startup
+if __name__ == "__main__" and "--startup-profile" in sys.argv:
+    startup.enable()  # Installed before the heavy imports below so they are measured.
+import asyncio
+import os
+from functools import cached_property
+from textual import work
 from textual.app import App
-from screens.list_screen import ProblemListScreen
-from screens.detail_screen import ProblemDetailScreen
+from textual.binding import Binding
+from changes import DELETE, EXTERNAL, INSERT, Change
 from database import ProblemDatabase
+from async_database import AsyncProblemDatabase
+from notes import NoteWriter
+from revisions import RevisionStore
+from blobstore import BlobStore
+from metrics import metrics
+from finder import FuzzyIndex
+startup.mark("imports")
+
+
+def _list_screen():
+    from screens.list_screen import ProblemListScreen
+    return ProblemListScreen()
+
+
+def _detail_screen(slug: str, name: str):
+    # The detail screen pulls in the Markdown stack and the judge; load it on first use.
+    from screens.detail_screen import ProblemDetailScreen
+    return ProblemDetailScreen(slug, name)
+
+
+def _finder_provider():
+    from palette import ProblemFinderProvider
+    return ProblemFinderProvider
+
 
 class ProblemTrackerApp(App):
     CSS_PATH = "styles/app.tcss"
     DB_PATH = "problems.db"
+    BINDINGS = [
+        Binding("f2", "show_stats", "Stats"),
+        Binding("f12", "toggle_metrics", "Metrics"),
+    ]
+    EXTERNAL_POLL = 0.5  # Seconds between checks for commits by other processes (the daemon)
     SCREENS = {
-        "list": ProblemListScreen,
-        "detail": lambda slug, name: ProblemDetailScreen(slug, name),
+        "list": _list_screen,
+        "detail": _detail_screen,
     }
+    COMMANDS = App.COMMANDS | {_finder_provider}
+    # Changes to these columns re-index a problem in the finder.
+    FINDER_COLUMNS = frozenset({"name", "grp", "url"})
 
     def on_mount(self):
-        self.database = ProblemDatabase(db_path=self.DB_PATH)
+        startup.mark("app mounted")
+        # CPNOTES_PROFILE=<file> captures a cProfile of the whole session.
+        if os.environ.get("CPNOTES_PROFILE"):
+            metrics.start_profile(os.environ["CPNOTES_PROFILE"])
+        self.database = ProblemDatabase(db_path=self.DB_PATH, persistent=True)
         self.database.init_db()
+        self.database.changes.attach(asyncio.get_running_loop())
+        self.adb = AsyncProblemDatabase(self.database)
+        self.notes = NoteWriter()
+        self.revisions = RevisionStore(self.database)
+        self.blobs = BlobStore()
+        # Command palette index, built in the background after the first paint.
+        self.finder: FuzzyIndex | None = None
+        self._finder_backlog: list[Change] | None = None  # Changes seen while building
+        self._finder_stale = False  # Another process committed since the last build
+        self._finder_changes: list[Change] = []  # Queued for _update_finder
+        self._finder_updating = False
+        self.database.subscribe(self._on_finder_changes)
+        startup.mark("database ready")
+        self.database.check_external_changes()
+        self.set_interval(self.EXTERNAL_POLL, self._poll_external_changes)
         self.push_screen("list")
 
-if __name__ == "__main__":
-    ProblemTrackerApp().run()
+    def _poll_external_changes(self):
+        # Runs on the writer thread so a long write never blocks the event loop.
+        self.adb.run_write(self.database.check_external_changes)
+
+    @cached_property
+    def judge(self):
+        from judge import Judge
+        return Judge()
+
+    def first_paint_done(self):
+        """Called by the list screen once its first page is on screen."""
+        if startup.enabled():
+            startup.mark("first paint")
+            self.exit(startup.finish())
+            return
+        if self.finder is None:
+            self._build_finder()
+
+    def refresh_finder(self):
+        """Rebuild the finder if it is missing or stale; called when the palette opens."""
+        if self._finder_backlog is not None:
+            return  # Already building.
+        if self.finder is None or self._finder_stale:
+            self._build_finder()
 
+    @work(exclusive=True, group="finder")
+    async def _build_finder(self):
+        self._finder_backlog = []
+        self._finder_stale = False
+        rows = await self.adb.finder_rows()
+        finder = await asyncio.to_thread(FuzzyIndex.build, rows)
+        self.finder = finder
+        backlog, self._finder_backlog = self._finder_backlog, None
+        if backlog:
+            self._queue_finder_changes(backlog)
+
+    def _on_finder_changes(self, changes: list[Change]):
+        if self._finder_backlog is not None:
+            self._finder_backlog.extend(changes)
+        elif self.finder is not None:
+            self._queue_finder_changes(changes)
+
+    def _queue_finder_changes(self, changes: list[Change]):
+        self._finder_changes.extend(changes)
+        if not self._finder_updating:
+            self._finder_updating = True
+            self._update_finder()
+
+    @work(group="finder-update")
+    async def _update_finder(self):
+        """
+        The only consumer of queued changes: batches are applied one after
+        the other, so a slow read for one never lands after a later batch.
+        """
+        try:
+            while self._finder_changes:
+                changes, self._finder_changes = self._finder_changes, []
+                await self._apply_finder_changes(changes)
+        finally:
+            self._finder_updating = False
+
+    async def _apply_finder_changes(self, changes: list[Change]):
+        """
+        Re-index just the problems named in ``changes``. Commits by other
+        processes do not say which rows they touched, so they only mark the
+        index stale and it is rebuilt the next time the palette opens.
+        """
+        if any(c.kind == EXTERNAL for c in changes):
+            self._finder_stale = True
+        removed = set()
+        touched = set()
+        for change in changes:
+            if change.kind == DELETE:
+                removed |= change.ids
+            elif change.kind == INSERT or change.columns & self.FINDER_COLUMNS:
+                touched |= change.ids
+        rows = await self.adb.finder_rows(touched) if touched else []
+        finder = self.finder
+        if finder is None:
+            return
+        for problem_id in removed | (touched - {row[0] for row in rows}):
+            finder.remove(problem_id)
+        for row in rows:
+            finder.add(*row)
+
+    async def open_problem(self, problem_id: int):
+        result = await self.adb.get_problem(problem_id)
+        if result:
+            slug, name, solved, save_note_on_solve = result  # Fetch additional fields
+            if solved and not save_note_on_solve:
+                # TODO: Inform the user that notes are not available
+                pass
+            else:
+                # Open the detail screen
+                self.push_screen(self.SCREENS["detail"](slug, name))
+
+    def on_unmount(self):
+        if "judge" in self.__dict__:
+            self.judge.close()
+        self.notes.close()
+        self.adb.close()
+        self.database.close()
+        metrics.stop_profile()
+        # CPNOTES_METRICS_DUMP=<file> writes the session's metrics on exit.
+        if metrics.enabled and os.environ.get("CPNOTES_METRICS_DUMP"):
+            metrics.dump(os.environ["CPNOTES_METRICS_DUMP"])
+
+    def action_show_stats(self):
+        # The stats screen closes itself on F2/Escape.
+        from screens.stats_screen import StatsScreen
+        self.push_screen(StatsScreen())
+
+    def action_toggle_metrics(self):
+        from screens.metrics_screen import MetricsScreen
+        if isinstance(self.screen, MetricsScreen):
+            self.screen.dismiss()
+        else:
+            self.push_screen(MetricsScreen())
+
+if __name__ == "__main__":
+    result = ProblemTrackerApp().run()
+    if result:
+        print(result)
@@ -0,0 +1,351 @@
+# archive.py
+"""
+Bulk NDJSON import and export: one problem per line.
+
+    python archive.py export problems.ndjson
+    python archive.py import problems.ndjson
+
+A line holds the problem's columns plus its sample tests, timing sessions
+and note text. Competitive Companion payloads (``group``, ``tests``,
+``timeLimit``/``memoryLimit``) import as they are.
+"""
+import argparse
+import functools
+import json
+import logging
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, TextIO
+
+from blobstore import BlobStore
+from database import ProblemDatabase
+from ingest import NOTES_DIR
+from migrations import defer_problem_schema, restore_deferred_schema
+from notes import atomic_write_text
+from utils import sanitize, unique_slug
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("slug", "name", "grp", "url", "solved", "save_note_on_solve", "note_path",
+            "time_limit", "memory_limit")
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def export_ndjson(database: ProblemDatabase, out: TextIO, blobs: BlobStore) -> int:
+    """Write every problem to ``out``, oldest first; returns how many."""
+    read_blob = functools.lru_cache(maxsize=1024)(functools.partial(_read_blob, blobs))
+    count = 0
+    with database.reader() as conn:
+        cursor = conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM problems ORDER BY id"
+        )
+        while rows := cursor.fetchmany(500):
+            for row in rows:
+                record = dict(zip(_COLUMNS, row))
+                slug = record["slug"]
+                record["group"] = record.pop("grp")
+                record["tests"] = [
+                    {"input": read_blob(input_hash), "output": read_blob(output_hash)}
+                    for input_hash, output_hash in conn.execute(
+                        "SELECT input_hash, output_hash FROM problem_tests WHERE slug = ? ORDER BY idx",
+                        (slug,)
+                    )
+                ]
+                record["sessions"] = conn.execute(
+                    "SELECT started_at, duration FROM sessions WHERE slug = ? ORDER BY started_at",
+                    (slug,)
+                ).fetchall()
+                note_path = Path(record["note_path"] or NOTES_DIR / f"{slug}.md")
+                if note_path.is_file():
+                    record["note"] = note_path.read_text(encoding="utf-8")
+                out.write(json.dumps(record, ensure_ascii=False))
+                out.write("\n")
+                count += 1
+    return count
+
+
+def _read_blob(blobs: BlobStore, digest: str) -> str:
+    try:
+        with blobs.open(digest) as stream:
+            return stream.read().decode("utf-8", errors="replace")
+    except FileNotFoundError:
+        logger.warning(f"Blob {digest} is missing; exporting an empty test")
+        return ""
+
+
+def _records(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping line {number}: {e}")
+
+
+def _claim_slugs(conn, records: list[dict[str, Any]]) -> None:
+    """
+    Problems are identified by URL: point each record at the slug its URL
+    is already stored under (here or earlier in the same chunk), so an
+    archive from another machine merges instead of duplicating. A new URL
+    whose slug belongs to a different problem gets the same suffix
+    ``save_problem`` gives it. A record without a URL only matches a
+    problem without one; otherwise it gets a suffix as well. Runs inside
+    the chunk's write transaction.
+    """
+    wanted = {}
+    for record in records:
+        if record.get("name"):
+            wanted[id(record)] = record.get("slug") or sanitize(record["name"])
+    urls = [record.get("url") for record in records if record.get("url")]
+    known = dict(conn.execute(
+        "SELECT url, slug FROM problems WHERE url IN (SELECT value FROM json_each(?))",
+        (json.dumps(urls),)
+    ))
+    taken = dict(conn.execute(
+        "SELECT slug, url FROM problems WHERE slug IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(wanted.values())),)
+    ))
+    for record in records:
+        slug = wanted.get(id(record))
+        url = record.get("url") or None
+        if slug is None:
+            continue  # No name; _row rejects it.
+        if url is not None:
+            if url in known:
+                slug = known[url]
+            elif slug in taken and taken[slug] != url:
+                slug = unique_slug(slug, url)
+            known[url] = slug
+            taken[slug] = url
+        elif taken.get(slug) is not None:
+            slug = unique_slug(slug, record["name"])
+            taken[slug] = None
+        if record.get("slug") and slug != record["slug"]:
+            record.pop("note_path", None)  # It named the note after the old slug.
+        record["slug"] = slug
+
+
+# Columns set on an already stored problem only when the line carries
+# them, with the record keys they may come under (ours, then Competitive
+# Companion's). A bare judge payload must not reset progress.
+_OPTIONAL = (
+    ("grp", ("group", "grp")),
+    ("time_limit", ("time_limit", "timeLimit")),
+    ("memory_limit", ("memory_limit", "memoryLimit")),
+    ("solved", ("solved",)),
+    ("save_note_on_solve", ("save_note_on_solve",)),
+)
+
+
+class _Row(NamedTuple):
+    values: tuple
+    present: dict[str, Any]
+    tests: list[tuple]
+    sessions: list[tuple]
+    note: str | None
+
+    @property
+    def slug(self) -> str:
+        return self.values[0]
+
+
+def _hash_tests(record: dict[str, Any], put: Callable[[str], str]) -> None:
+    """Store the record's tests in the BlobStore (outside the write transaction)."""
+    record["tests"] = [
+        (put(test.get("input", "")), put(test.get("output", "")))
+        for test in record.get("tests") or []
+    ]
+
+
+def _row(record: dict[str, Any], notes_dir: Path) -> _Row:
+    """Turn one claimed NDJSON record (tests already hashed) into a _Row."""
+    name = record["name"]
+    slug = record["slug"]
+    present = {}
+    for column, keys in _OPTIONAL:
+        for key in keys:
+            if key in record:
+                present[column] = record[key]
+                break
+    for column in ("solved", "save_note_on_solve"):
+        if column in present:
+            present[column] = int(bool(present[column]))
+    for column in ("time_limit", "memory_limit"):
+        if column in present:
+            present[column] = present[column] or 0
+    values = (
+        slug, name, present.get("grp"), record.get("url") or None,
+        present.get("solved", 0), present.get("save_note_on_solve", 0),
+        record.get("note_path") or str(notes_dir / f"{slug}.md"),
+        present.get("time_limit", 0), present.get("memory_limit", 0),
+    )
+    tests = [(slug, i, input_hash, output_hash) for i, (input_hash, output_hash) in enumerate(record["tests"], 1)]
+    sessions = [(slug, started_at, duration) for started_at, duration in record.get("sessions") or []]
+    return _Row(values, present, tests, sessions, record.get("note"))
+
+
+def _upsert_sql(target: str) -> str:
+    # Only the name is refreshed on conflict; see _OPTIONAL for the rest.
+    return (
+        f"INSERT INTO problems ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+        f"ON CONFLICT ({target}) DO UPDATE SET name = excluded.name"
+    )
+
+
+def _notes_to_write(conn, rows: list[_Row], notes_dir: Path) -> list[tuple[str, Path, str]]:
+    """(slug, path, text) for imported notes whose stored note file is missing or empty."""
+    paths = dict(conn.execute(
+        "SELECT slug, note_path FROM problems WHERE slug IN (SELECT value FROM json_each(?))",
+        (json.dumps([row.slug for row in rows if row.note]),)
+    ))
+    notes = []
+    for row in rows:
+        if not row.note or row.slug not in paths:
+            continue
+        path = Path(paths[row.slug] or notes_dir / f"{row.slug}.md")
+        if not (path.is_file() and path.stat().st_size):
+            notes.append((row.slug, path, row.note))
+    return notes
+
+
+def _index_chunk(conn, rows: list[_Row], existing: set[str], last_id: int,
+                 notes: list[tuple[str, Path, str]]) -> None:
+    """
+    Bring problems_fts up to date for one imported chunk while its triggers
+    are dropped: new rows are indexed with a single INSERT ... SELECT,
+    updated ones get their stored name and group, and only the notes
+    actually being written get their body indexed.
+    """
+    conn.execute(
+        "INSERT INTO problems_fts (rowid, name, grp, body) SELECT id, name, grp, '' FROM problems WHERE id > ?",
+        (last_id,)
+    )
+    conn.execute(
+        "UPDATE problems_fts SET name = p.name, grp = p.grp FROM problems p "
+        "WHERE p.id = problems_fts.rowid AND p.slug IN (SELECT value FROM json_each(?))",
+        (json.dumps([row.slug for row in rows if row.slug in existing]),)
+    )
+    conn.executemany(
+        "UPDATE problems_fts SET body = ? WHERE rowid = (SELECT id FROM problems WHERE slug = ?)",
+        [(note, slug) for slug, _, note in notes]
+    )
+
+
+def import_ndjson(database: ProblemDatabase, lines: Iterable[str], blobs: BlobStore, *,
+                  chunk_size: int = 2000, notes_dir: Path = NOTES_DIR) -> int:
+    """
+    Upsert every record in ``lines`` (keyed by URL, by slug when it has
+    none) and return how many.
+
+    Rows go in with ``executemany``, one transaction per ``chunk_size``
+    lines. The secondary indexes on ``problems`` and the full-text and
+    group statistics triggers are dropped for the duration and rebuilt
+    once at the end. Note files are written only where none exists yet.
+    """
+    records = _records(lines)
+    # Sample tests repeat a lot across an archive; skip re-hashing known ones.
+    blobs_put = functools.lru_cache(maxsize=4096)(blobs.put)
+    count = 0
+    with database.writer() as conn:
+        deferred = defer_problem_schema(conn)
+    logger.info(f"Deferred {len(deferred)} indexes and triggers for the import")
+    try:
+        for chunk in _chunks(records, chunk_size):
+            accepted = []
+            for record in chunk:
+                try:
+                    _hash_tests(record, blobs_put)
+                    accepted.append(record)
+                except (AttributeError, TypeError) as e:
+                    logger.error(f"Skipping malformed record {str(record)[:80]!r}: {e}")
+            with database.writer() as conn:
+                _claim_slugs(conn, accepted)
+                rows = []
+                for record in accepted:
+                    try:
+                        rows.append(_row(record, notes_dir))
+                    except (KeyError, TypeError, ValueError) as e:
+                        logger.error(f"Skipping malformed record {str(record)[:80]!r}: {e}")
+                existing = {slug for slug, in conn.execute(
+                    "SELECT slug FROM problems WHERE slug IN (SELECT value FROM json_each(?))",
+                    (json.dumps([row.slug for row in rows]),)
+                )}
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM problems").fetchone()[0]
+                conn.executemany(_upsert_sql("url"), [row.values for row in rows if row.values[3]])
+                conn.executemany(_upsert_sql("slug"), [row.values for row in rows if not row.values[3]])
+                for column, _ in _OPTIONAL:
+                    conn.executemany(
+                        f"UPDATE problems SET {column} = ? WHERE slug = ?",
+                        [(row.present[column], row.slug) for row in rows
+                         if row.slug in existing and column in row.present]
+                    )
+                notes = _notes_to_write(conn, rows, notes_dir)
+                _index_chunk(conn, rows, existing, last_id, notes)
+                conn.executemany("DELETE FROM problem_tests WHERE slug = ?", [(row.slug,) for row in rows])
+                conn.executemany(
+                    "INSERT INTO problem_tests (slug, idx, input_hash, output_hash) VALUES (?, ?, ?, ?)",
+                    [test for row in rows for test in row.tests]
+                )
+                conn.executemany("DELETE FROM sessions WHERE slug = ? AND started_at IS NULL",
+                                 [(row.slug,) for row in rows if row.sessions])
+                conn.executemany(
+                    "INSERT INTO sessions (slug, started_at, duration) VALUES (?, ?, ?) "
+                    "ON CONFLICT (slug, started_at) DO UPDATE SET duration = excluded.duration",
+                    [session for row in rows for session in row.sessions]
+                )
+            for _, path, note in notes:
+                atomic_write_text(path, note)
+            count += len(rows)
+            logger.info(f"Imported {count} problems")
+    finally:
+        with database.writer() as conn:
+            restore_deferred_schema(conn)
+    database.invalidate_rows()
+    database.changes.publish_external()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import and export problems as NDJSON")
+    parser.add_argument("--db", default="problems.db", help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every problem as one JSON object per line")
+    export.add_argument("path", nargs="?", default="-", help="output file, - for stdout")
+    load = sub.add_parser("import", help="upsert problems from NDJSON")
+    load.add_argument("path", nargs="?", default="-", help="input file, - for stdin")
+    load.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    database = ProblemDatabase(args.db, persistent=True)
+    database.init_db()
+    blobs = BlobStore()
+    try:
+        if args.command == "export":
+            if args.path == "-":
+                count = export_ndjson(database, sys.stdout, blobs)
+            else:
+                with open(args.path, "w", encoding="utf-8") as out:
+                    count = export_ndjson(database, out, blobs)
+            logger.info(f"Exported {count} problems")
+        else:
+            if args.path == "-":
+                import_ndjson(database, sys.stdin, blobs, chunk_size=args.chunk_size)
+            else:
+                with open(args.path, encoding="utf-8") as lines:
+                    import_ndjson(database, lines, blobs, chunk_size=args.chunk_size)
+            # Re-imported problems replace their tests, which can orphan blobs.
+            blobs.gc(database.test_blob_hashes())
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# async_database.py
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from database import ProblemDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncProblemDatabase:
+    """
+    Awaitable facade over ProblemDatabase.
+
+    Writes run one at a time, in submission order, on a dedicated writer
+    thread; reads run on a small thread pool. Each call is submitted as soon
+    as it is made and returns an asyncio future, so a write whose result is
+    not needed can be fired without awaiting it.
+    """
+
+    READ_METHODS = frozenset({
+        "load_problems", "load_problems_page", "load_problems_by_ids",
+        "search_problems", "get_problem", "get_problem_full", "get_url", "get_save_note_on_solve",
+        "get_time_spent", "get_limits", "get_problem_tests", "test_blob_hashes",
+        "check_query_plans", "time_by_day", "time_by_group", "group_stats", "load_group_page",
+        "finder_rows",
+    })
+    WRITE_METHODS = frozenset({
+        "create_problem", "save_problem", "save_problems", "update_problem",
+        "update_note_body", "delete_problem", "mark_solved",
+        "increment_time_spent", "update_time_spent", "record_session",
+    })
+
+    def __init__(self, database: ProblemDatabase, read_workers: int = 2):
+        self.database = database
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-reader")
+
+    def run_read(self, fn: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        """Run ``fn`` on the read pool."""
+        return self._submit(self._readers, fn, args, kwargs)
+
+    def run_write(self, fn: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        """Run ``fn`` on the writer thread, after every write submitted before it."""
+        return self._submit(self._writer, fn, args, kwargs)
+
+    def _submit(self, executor: ThreadPoolExecutor, fn: Callable[..., Any],
+                args: tuple, kwargs: dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(_log_failure)
+        return future
+
+    def __getattr__(self, name: str) -> Callable[..., asyncio.Future]:
+        if name in self.READ_METHODS:
+            return functools.partial(self.run_read, getattr(self.database, name))
+        if name in self.WRITE_METHODS:
+            return functools.partial(self.run_write, getattr(self.database, name))
+        raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+    def close(self) -> None:
+        """Wait for queued writes to finish, then stop the worker threads."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Database call failed: {error!r}")
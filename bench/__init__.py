@@ -0,0 +1,7 @@
+"""
+Benchmarks for ingest, ProblemDatabase and the list screen.
+
+Run ``python -m bench --help`` from the repository root. Every suite writes
+JSON so runs from different commits can be compared with ``python -m bench
+compare old.json new.json``.
+"""
@@ -0,0 +1,74 @@
+# bench/__main__.py
+import argparse
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+from bench import common
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="cpnotes benchmarks")
+    sub = parser.add_subparsers(dest="suite", required=True)
+
+    ingest = sub.add_parser("ingest", help="load-generate TCPServer and time end-to-end ingest")
+    ingest.add_argument("--clients", type=int, default=8)
+    ingest.add_argument("--problems", type=int, default=400)
+    ingest.add_argument("--batch-size", type=int, default=1)
+    ingest.add_argument("--test-bytes", type=int, default=64)
+    ingest.add_argument("--port", type=int, default=27199)
+
+    db = sub.add_parser("db", help="micro-benchmark ProblemDatabase methods")
+    db.add_argument("--sizes", type=int, nargs="+", default=list(common_sizes()))
+    db.add_argument("--repeat", type=int, default=50)
+    db.add_argument("--per-call-connections", action="store_true",
+                    help="benchmark ProblemDatabase without the connection pool")
+
+    ui = sub.add_parser("ui", help="time ProblemListScreen headless with Textual's pilot")
+    ui.add_argument("--sizes", type=int, nargs="+", default=list(common_sizes()))
+    ui.add_argument("--repeat", type=int, default=20)
+
+    for suite in (ingest, db, ui):
+        suite.add_argument("--out", type=Path, help="write JSON here instead of stdout")
+
+    cmp = sub.add_parser("compare", help="compare two JSON result files")
+    cmp.add_argument("old", type=Path)
+    cmp.add_argument("new", type=Path)
+
+    args = parser.parse_args()
+    if args.suite == "compare":
+        for metric, old, new, change in common.compare(args.old, args.new):
+            print(f"{metric:60} {old:12.3f} {new:12.3f} {change:+8.1f}%")
+        return
+
+    with tempfile.TemporaryDirectory(prefix="cpnotes-bench-") as tmp:
+        workdir = Path(tmp)
+        if args.suite == "ingest":
+            from bench import ingest as suite
+            cwd = os.getcwd()
+            os.chdir(workdir)  # Keep notes/ and blobs/ out of the checkout.
+            try:
+                results = asyncio.run(suite.run(
+                    workdir, clients=args.clients, problems=args.problems,
+                    batch_size=args.batch_size, test_bytes=args.test_bytes, port=args.port,
+                ))
+            finally:
+                os.chdir(cwd)
+        elif args.suite == "db":
+            from bench import db as suite
+            results = suite.run(workdir, sizes=tuple(args.sizes), repeat=args.repeat,
+                                persistent=not args.per_call_connections)
+        else:
+            from bench import ui as suite
+            results = asyncio.run(suite.run(workdir, sizes=tuple(args.sizes), repeat=args.repeat))
+        common.write_results(args.out, args.suite, results)
+
+
+def common_sizes() -> tuple[int, ...]:
+    from bench.db import SIZES
+    return SIZES
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench/common.py
+import json
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Summarise latencies (seconds) as milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def time_calls(fn, repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def make_payload(index: int, group: str, *, test_bytes: int = 64,
+                 batch_id: str | None = None, batch_size: int = 1) -> dict[str, Any]:
+    """A Competitive Companion payload shaped like send_sample.py's."""
+    line = ("1 " * max(test_bytes // 2, 1)).strip() + "\n"
+    return {
+        "name": f"P{index}. Bench Problem {index}",
+        "group": group,
+        "url": f"https://codeforces.com/problemset/problem/{index // 10}/{chr(65 + index % 10)}",
+        "interactive": False,
+        "memoryLimit": 256,
+        "timeLimit": 1000,
+        "tests": [{"input": line, "output": "1\n"}],
+        "testType": "single",
+        "input": {"type": "stdin"},
+        "output": {"type": "stdout"},
+        "batch": {"id": batch_id or f"single-{index}", "size": batch_size},
+    }
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+    }
+
+
+def write_results(path: Path | None, suite: str, results: dict[str, Any]) -> dict[str, Any]:
+    document = {"suite": suite, "environment": environment(), "results": results}
+    text = json.dumps(document, indent=2)
+    if path is None:
+        print(text)
+    else:
+        path.write_text(text)
+        print(f"Wrote {path}")
+    return document
+
+
+def _flatten(prefix: str, value: Any, out: dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(old_path: Path, new_path: Path) -> list[tuple[str, float, float, float]]:
+    """Return (metric, old, new, change %) for every numeric metric in both files."""
+    old: dict[str, float] = {}
+    new: dict[str, float] = {}
+    _flatten("", json.loads(old_path.read_text())["results"], old)
+    _flatten("", json.loads(new_path.read_text())["results"], new)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        rows.append((key, old[key], new[key], change))
+    return rows
@@ -0,0 +1,58 @@
+# bench/db.py
+"""Micro-benchmarks for ProblemDatabase methods at several table sizes."""
+from pathlib import Path
+from typing import Any
+
+from bench.common import time_calls
+from database import ProblemDatabase
+from finder import FuzzyIndex
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def populate(database: ProblemDatabase, rows: int, chunk: int = 5_000) -> None:
+    for start in range(0, rows, chunk):
+        database.save_problems([
+            dict(name=f"P{i}. Problem {i}", grp=f"Round {i // 8}", url=f"https://example.com/{i}",
+                 slug=f"p{i}", solved=i % 3 == 0)
+            for i in range(start, min(start + chunk, rows))
+        ])
+
+
+def run(workdir: Path, *, sizes: tuple[int, ...] = SIZES, repeat: int = 50,
+        persistent: bool = True) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for size in sizes:
+        path = workdir / f"db-{size}.db"
+        database = ProblemDatabase(str(path), persistent=persistent)
+        database.init_db()
+        populate(database, size)
+        mid = f"p{size // 2}"
+        mid_id = size // 2 + 1
+        counter = iter(range(10 ** 9))
+        finder = FuzzyIndex.build(database.finder_rows())
+        cases = {
+            "load_problems": lambda: database.load_problems({"solved": False}),
+            "load_problems_page": lambda: database.load_problems_page({"solved": False}, page_size=200),
+            "load_problems_page_deep": lambda: database.load_problems_page(
+                {"solved": False}, page_size=200, after_id=mid_id),
+            "search_problems": lambda: database.search_problems("problem 42"),
+            "finder_search": lambda: finder.search("probelm 42 round"),
+            "get_problem": lambda: database.get_problem(mid_id),
+            "get_problem_full": lambda: database.get_problem_full(mid),
+            "get_problem_full_cold": lambda: (database.invalidate_rows(), database.get_problem_full(mid)),
+            "get_url": lambda: database.get_url(mid),
+            "get_time_spent": lambda: database.get_time_spent(mid),
+            "get_save_note_on_solve": lambda: database.get_save_note_on_solve(mid),
+            "update_time_spent": lambda: database.update_time_spent(mid, next(counter)),
+            "update_problem": lambda: database.update_problem(mid, save_note_on_solve=next(counter) % 2),
+            "save_problem": lambda: database.save_problem(
+                f"Bench {next(counter)}", "Bench", f"https://example.com/bench/{next(counter)}",
+                f"bench{next(counter)}"),
+        }
+        results[str(size)] = {
+            name: time_calls(fn, 3 if name == "load_problems" and size >= 100_000 else repeat)
+            for name, fn in cases.items()
+        }
+        database.close()
+    return results
@@ -0,0 +1,111 @@
+# bench/ingest.py
+"""
+Drive TCPServer with concurrent HTTP clients and measure how long each
+problem takes from the first byte sent until load_problems returns it.
+Payloads take the app's own path: IngestQueue with a spool, prepare_rows
+into a BlobStore, and AsyncProblemDatabase.save_problems.
+"""
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from async_database import AsyncProblemDatabase
+from bench.common import make_payload, percentiles
+from blobstore import BlobStore
+from database import ProblemDatabase
+from ingest import IngestQueue, Spool, prepare_rows
+from server import TCPServer
+from utils import sanitize
+
+
+async def _post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, payload: dict) -> None:
+    body = json.dumps(payload).encode()
+    writer.write(
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = await reader.readline()
+    if not status.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(f"Server answered {status!r}")
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+
+
+async def _wait_visible(database: ProblemDatabase, slug: str, poll: float) -> None:
+    while not await asyncio.to_thread(database.load_problems, {"slug": slug}):
+        await asyncio.sleep(poll)
+
+
+async def _client(port: int, database: ProblemDatabase, batches: list[list[dict]],
+                  latencies: list[float], poll: float) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for batch in batches:
+            sent = []
+            for payload in batch:
+                sent.append((time.perf_counter(), sanitize(payload["name"])))
+                await _post(reader, writer, payload)
+            for start, slug in sent:
+                await _wait_visible(database, slug, poll)
+                latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run(workdir: Path, *, clients: int = 8, problems: int = 400, batch_size: int = 1,
+              test_bytes: int = 64, port: int = 27199, poll: float = 0.001) -> dict[str, Any]:
+    """
+    Send ``problems`` payloads from ``clients`` keep-alive connections in
+    batches of ``batch_size`` and return throughput and latency percentiles.
+    """
+    database = ProblemDatabase(str(workdir / "bench.db"), persistent=True)
+    database.init_db()
+    adb = AsyncProblemDatabase(database)
+    blobs = BlobStore(workdir / "blobs")
+
+    async def save(payloads: list[dict]) -> None:
+        rows = await asyncio.to_thread(prepare_rows, payloads, blobs, workdir / "notes")
+        await adb.save_problems(rows)
+
+    queue = IngestQueue(save, spool=Spool(workdir / "ingest.spool"))
+    await queue.start()
+    server = TCPServer(port=port, callback=queue.put)
+    await server.start()
+
+    per_client: list[list[list[dict]]] = [[] for _ in range(clients)]
+    index = 0
+    while index < problems:
+        size = min(batch_size, problems - index)
+        batch_id = str(uuid.uuid4())
+        batch = [make_payload(index + i, f"Bench group {index // batch_size}", test_bytes=test_bytes,
+                              batch_id=batch_id, batch_size=size) for i in range(size)]
+        per_client[(index // batch_size) % clients].append(batch)
+        index += size
+
+    latencies: list[float] = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _client(port, database, batches, latencies, poll) for batches in per_client if batches
+        ))
+    finally:
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.1)  # Let the server see the clients hang up before stopping.
+        await server.stop()
+        await queue.close()
+        adb.close()
+        database.close()
+    return {
+        "clients": clients,
+        "problems": problems,
+        "batch_size": batch_size,
+        "test_bytes": test_bytes,
+        "seconds": elapsed,
+        "throughput_per_s": problems / elapsed if elapsed else 0.0,
+        "latency": percentiles(latencies),
+    }
@@ -0,0 +1,58 @@
+# bench/ui.py
+"""Headless list-screen benchmarks using Textual's pilot."""
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import app as app_module
+from bench.common import percentiles
+from bench.db import SIZES, populate
+from database import ProblemDatabase
+
+
+async def _bench_size(workdir: Path, size: int, repeat: int) -> dict[str, Any]:
+    db_path = workdir / f"ui-{size}.db"
+    database = ProblemDatabase(str(db_path), persistent=True)
+    database.init_db()
+    populate(database, size)
+    database.close()
+
+    class BenchApp(app_module.ProblemTrackerApp):
+        CSS_PATH = str(Path(app_module.__file__).parent / "styles" / "app.tcss")
+        DB_PATH = str(db_path)
+
+    start = time.perf_counter()
+    async with BenchApp().run_test(size=(120, 40)) as pilot:
+        await pilot.pause()
+        screen = pilot.app.screen
+        await pilot.app.workers.wait_for_complete()
+        first_paint = time.perf_counter() - start
+
+        samples = []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            worker = screen._refresh_list()
+            await worker.wait()
+            await pilot.pause()
+            samples.append(time.perf_counter() - begin)
+
+        await pilot.press("end")
+        begin = time.perf_counter()
+        await pilot.app.workers.wait_for_complete()
+        await pilot.pause()
+        next_page = time.perf_counter() - begin
+    return {
+        "first_paint_ms": first_paint * 1000,
+        "refresh_list": percentiles(samples),
+        "scroll_to_end_ms": next_page * 1000,
+    }
+
+
+async def run(workdir: Path, *, sizes: tuple[int, ...] = SIZES, repeat: int = 20) -> dict[str, Any]:
+    cwd = os.getcwd()
+    os.chdir(workdir)  # The app opens ingest.spool, notes/ and blobs/ relative to it.
+    try:
+        return {str(size): await _bench_size(workdir, size, repeat) for size in sizes}
+    finally:
+        os.chdir(cwd)
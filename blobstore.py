@@ -0,0 +1,154 @@
+# blobstore.py
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_SUFFIX = ".z"
+# Blobs younger than this (seconds) survive gc: an ingest may have stored
+# them without having committed the rows that reference them yet.
+GC_MIN_AGE = 3600
+
+
+class _ZlibReader:
+    """Minimal file-like reader that inflates a zlib stream chunk by chunk."""
+
+    def __init__(self, raw: BinaryIO, chunk_size: int = 1 << 16):
+        self._raw = raw
+        self._chunk_size = chunk_size
+        self._inflate = zlib.decompressobj()
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._raw.read(self._chunk_size)
+            if chunk:
+                self._buffer += self._inflate.decompress(chunk)
+            else:
+                self._buffer += self._inflate.flush()
+                self._eof = True
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+@contextmanager
+def open_blob(path: Path) -> Iterator[BinaryIO]:
+    """
+    Open a stored blob for streaming reads: plain blobs are memory-mapped,
+    compressed ones are inflated incrementally.
+    """
+    with open(path, "rb") as f:
+        if path.suffix == COMPRESSED_SUFFIX:
+            yield _ZlibReader(f)
+            return
+        if os.fstat(f.fileno()).st_size == 0:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+class BlobStore:
+    """
+    Content-addressed files under ``root``, named by SHA-256 of the content.
+
+    Identical content is stored once no matter how many problems use it.
+    Blobs of at least ``compress_min`` bytes are zlib-compressed when that
+    saves at least 10%; they carry a ``.z`` suffix.
+    """
+
+    def __init__(self, root: Path | str = "blobs", compress_min: int = 64 * 1024):
+        self.root = Path(root)
+        self.compress_min = compress_min
+
+    def _base(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def path(self, digest: str) -> Path | None:
+        """Return the file holding ``digest``, or None if it is not stored."""
+        base = self._base(digest)
+        if base.exists():
+            return base
+        compressed = base.with_name(base.name + COMPRESSED_SUFFIX)
+        if compressed.exists():
+            return compressed
+        return None
+
+    def put(self, data: bytes | str) -> str:
+        """Store ``data`` if it is new and return its digest."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.path(digest)
+        if existing is not None:
+            try:
+                os.utime(existing)  # Fresh again, so gc leaves it to the caller.
+            except OSError:
+                pass
+            return digest
+        target = self._base(digest)
+        if len(data) >= self.compress_min:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data) * 0.9:
+                data = packed
+                target = target.with_name(target.name + COMPRESSED_SUFFIX)
+        self._write(target, data)
+        return digest
+
+    @contextmanager
+    def open(self, digest: str) -> Iterator[BinaryIO]:
+        path = self.path(digest)
+        if path is None:
+            raise FileNotFoundError(f"Blob {digest} is not in {self.root}")
+        with open_blob(path) as stream:
+            yield stream
+
+    def gc(self, live: set[str], min_age: float = GC_MIN_AGE) -> int:
+        """
+        Delete blobs whose digest is not in ``live`` and that were not
+        stored or reused in the last ``min_age`` seconds; returns how many went.
+        """
+        removed = 0
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - min_age
+        for path in self.root.glob("*/*"):
+            digest = path.name.removesuffix(COMPRESSED_SUFFIX)
+            if path.name.startswith(".") or digest in live:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs")
+        return removed
+
+    def _write(self, target: Path, data: bytes) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".", dir=target.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,135 @@
+# changes.py
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+# Another process committed to the database; which rows changed is unknown.
+EXTERNAL = "external"
+
+
+@dataclass(frozen=True)
+class Change:
+    """A row-level delta: ``kind`` applied to ``ids``, touching ``columns``."""
+    kind: str
+    ids: frozenset[int]
+    columns: frozenset[str] = frozenset()
+
+
+Subscriber = Callable[[list[Change]], None]
+
+
+class ChangeBus:
+    """
+    Debounce and coalesce row changes before handing them to subscribers.
+
+    Changes published within ``window`` seconds of the first pending one are
+    merged per row (insert+update is an insert, insert+delete vanishes,
+    updates union their columns) and delivered as one list of Change on the
+    attached event loop. Without a loop, changes are delivered immediately.
+    Commits by other processes arrive as a single EXTERNAL change.
+    """
+
+    def __init__(self, window: float = 0.05, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.window = window
+        self._loop = loop
+        self._subscribers: list[Subscriber] = []
+        self._lock = threading.Lock()
+        self._pending: dict[int, tuple[str, set[str]]] = {}
+        self._external = False
+        self._scheduled = False
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Deliver future changes on ``loop`` (the Textual app's event loop)."""
+        self._loop = loop
+
+    def subscribe(self, subscriber: Subscriber) -> Callable[[], None]:
+        """Add a subscriber and return a function that removes it again."""
+        self._subscribers.append(subscriber)
+
+        def unsubscribe() -> None:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def publish(self, kind: str, ids: Iterable[int], columns: Iterable[str] = ()) -> None:
+        ids = [pid for pid in ids if pid is not None]
+        if not ids:
+            return
+        columns = set(columns)
+        with self._lock:
+            for pid in ids:
+                self._merge(pid, kind, columns)
+        self._schedule()
+
+    def publish_external(self) -> None:
+        """Report that another process changed the database (see EXTERNAL)."""
+        with self._lock:
+            self._external = True
+        self._schedule()
+
+    def _schedule(self) -> None:
+        with self._lock:
+            schedule = not self._scheduled
+            self._scheduled = True
+        if not schedule:
+            return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.flush()
+        elif _running_loop() is loop:
+            loop.call_later(self.window, self.flush)
+        else:
+            loop.call_soon_threadsafe(loop.call_later, self.window, self.flush)
+
+    def _merge(self, pid: int, kind: str, columns: set[str]) -> None:
+        previous = self._pending.get(pid)
+        if previous is None:
+            self._pending[pid] = (kind, set(columns))
+            return
+        prev_kind, prev_columns = previous
+        if kind == DELETE:
+            if prev_kind == INSERT:
+                del self._pending[pid]
+            else:
+                self._pending[pid] = (DELETE, set())
+        elif kind == INSERT:
+            self._pending[pid] = (INSERT, set())
+        elif prev_kind in (INSERT, DELETE):
+            pass
+        else:
+            self._pending[pid] = (prev_kind, prev_columns | columns)
+
+    def flush(self) -> None:
+        """Deliver everything pending now."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            external, self._external = self._external, False
+            self._scheduled = False
+        if not pending and not external:
+            return
+        grouped: dict[tuple[str, frozenset[str]], set[int]] = {}
+        for pid, (kind, columns) in pending.items():
+            grouped.setdefault((kind, frozenset(columns)), set()).add(pid)
+        changes = [Change(kind, frozenset(ids), columns) for (kind, columns), ids in grouped.items()]
+        if external:
+            changes.insert(0, Change(EXTERNAL, frozenset()))
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(changes)
+            except Exception as e:
+                logger.error(f"Error in change subscriber: {e}")
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,150 @@
+# connection.py
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class ConnectionManager:
+    """
+    One long-lived writer connection plus a small pool of read connections.
+
+    The writer is guarded by a re-entrant lock so nested ``writer()`` blocks
+    join the outermost transaction, which commits (or rolls back) once.
+    """
+
+    def __init__(self, db_path: str, *, read_pool_size: int = 4,
+                 cached_statements: int = 256, timeout: float = 5.0):
+        self.db_path = db_path
+        self.read_pool_size = max(1, read_pool_size)
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._write_owner: int | None = None
+        self._writer: sqlite3.Connection | None = None
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all_readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            isolation_level=None,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Yield the writer connection inside a transaction."""
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("ConnectionManager is closed")
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            outermost = self._write_depth == 0
+            if outermost:
+                conn.execute("BEGIN IMMEDIATE")
+                self._write_owner = threading.get_ident()
+            self._write_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._write_depth -= 1
+                if outermost:
+                    self._write_owner = None
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                self._write_depth -= 1
+                if outermost:
+                    self._write_owner = None
+                    conn.execute("COMMIT")
+
+    def data_version(self) -> int:
+        """
+        ``PRAGMA data_version`` of the writer connection. It changes only
+        when another connection (e.g. another process) commits, never for
+        this manager's own writes.
+        """
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("ConnectionManager is closed")
+            if self._writer is None:
+                self._writer = self._connect()
+            return self._writer.execute("PRAGMA data_version").fetchone()[0]
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read connection from the pool.
+
+        Reads issued from inside a ``writer()`` block on the same thread use
+        the writer so they see the uncommitted changes of that transaction.
+        """
+        if self._write_owner == threading.get_ident():
+            yield self._writer
+            return
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("ConnectionManager is closed")
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self.read_pool_size:
+                conn = self._connect()
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get(timeout=self.timeout)
+
+    def close(self) -> None:
+        """Close the writer and every pooled reader."""
+        with self._write_lock:
+            self._closed = True
+            if self._writer is not None:
+                try:
+                    self._writer.execute("PRAGMA optimize")
+                except sqlite3.Error as e:
+                    logger.debug(f"PRAGMA optimize failed: {e}")
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            while True:
+                try:
+                    self._readers.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+        logger.info("Database connections closed")
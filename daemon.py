@@ -0,0 +1,79 @@
+# daemon.py
+"""
+Headless ingest: run TCPServer and write incoming problems to the database
+without the TUI. A running TUI notices the new rows through
+``ProblemDatabase.check_external_changes``.
+
+    python daemon.py [--db problems.db] [--host 127.0.0.1] [--port 27121]
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from async_database import AsyncProblemDatabase
+from blobstore import BlobStore
+from database import ProblemDatabase
+from ingest import IngestQueue, RecentPayloads, Spool, prepare_rows
+from server import TCPServer
+
+logger = logging.getLogger(__name__)
+
+
+async def run(db_path: str = "problems.db", host: str = "127.0.0.1", port: int = 27121,
+              max_pending: int = 256) -> None:
+    """Serve until SIGINT/SIGTERM, then save pending batches and close."""
+    database = ProblemDatabase(db_path, persistent=True)
+    database.init_db()
+    adb = AsyncProblemDatabase(database)
+    blobs = BlobStore()
+
+    def save_batch(payloads: list[dict]) -> None:
+        rows = prepare_rows(payloads, blobs)
+        database.save_problems(rows)
+        logger.info(f"Saved {len(rows)} problems")
+
+    def collect_garbage() -> None:
+        blobs.gc(database.test_blob_hashes())
+
+    async def save(payloads: list[dict]) -> None:
+        # One writer thread keeps batches in arrival order without blocking the server.
+        await adb.run_write(save_batch, payloads)
+
+    queue = IngestQueue(save, spool=Spool(), max_pending=max_pending, recent=RecentPayloads())
+    await queue.start()  # Replays whatever a previous run accepted but never saved.
+    # Drop test blobs no problem references any more. On the writer thread, so
+    # it runs between batches rather than during one.
+    await adb.run_write(collect_garbage)
+    server = TCPServer(host=host, port=port, callback=queue.put)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await server.start()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down")
+        await server.stop()
+        await queue.close()
+        adb.close()
+        database.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Receive problems from Competitive Companion without the TUI")
+    parser.add_argument("--db", default="problems.db", help="database file (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27121)
+    parser.add_argument("--max-pending", type=int, default=256,
+                        help="problems accepted but not yet saved before senders are held back")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run(args.db, args.host, args.port, args.max_pending))
+
+
+if __name__ == "__main__":
+    main()
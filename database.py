@@ -1,103 +1,512 @@
 import sqlite3
 import logging
-from typing import Any, Callable, List
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Iterable, Iterator, NamedTuple
+from changes import DELETE, INSERT, UPDATE, ChangeBus, Subscriber
+from connection import ConnectionManager
+from metrics import metrics
+from migrations import full_scans, migrate, restore_deferred_schema
+from utils import unique_slug
+
+
+class ProblemRecord(NamedTuple):
+    """One problem row as returned by ``get_problem_full``; time_spent sums its sessions."""
+    id: int
+    slug: str
+    name: str
+    grp: str | None
+    url: str | None  # legacy_url for rows whose URL an older problem owns
+    solved: int
+    save_note_on_solve: int
+    note_path: str | None
+    time_limit: int
+    memory_limit: int
+    time_spent: int
+
+
+class RowCache:
+    """
+    Thread-safe LRU of ProblemRecord keyed by slug, with an id index.
+
+    Readers take ``generation`` before querying and pass it to ``put``; any
+    invalidation in between bumps it and the possibly stale row is dropped.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._records: OrderedDict[str, ProblemRecord] = OrderedDict()
+        self._slugs: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: int | str) -> ProblemRecord | None:
+        with self._lock:
+            slug = self._slugs.get(key) if isinstance(key, int) else key
+            record = self._records.get(slug)
+            if record is not None:
+                self._records.move_to_end(slug)
+            return record
+
+    def put(self, record: ProblemRecord, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._records[record.slug] = record
+            self._records.move_to_end(record.slug)
+            self._slugs[record.id] = record.slug
+            while len(self._records) > self.maxsize:
+                _, evicted = self._records.popitem(last=False)
+                self._slugs.pop(evicted.id, None)
+
+    def invalidate(self, slugs: Iterable[str] | None = None) -> None:
+        """Drop ``slugs`` (every row when None)."""
+        with self._lock:
+            self.generation += 1
+            if slugs is None:
+                self._records.clear()
+                self._slugs.clear()
+                return
+            for slug in slugs:
+                record = self._records.pop(slug, None)
+                if record is not None:
+                    self._slugs.pop(record.id, None)
+
 
 class ProblemDatabase:
-    def __init__(self, db_path: str = "problems.db"):
+    def __init__(self, db_path: str = "problems.db", *, persistent: bool = False,
+                 read_pool_size: int = 4, change_window: float = 0.05):
+        """
+        With ``persistent=True`` all queries go through a ConnectionManager
+        (one WAL writer plus ``read_pool_size`` readers) instead of opening a
+        new connection per call. Call ``close()`` when done.
+
+        Row changes are published on ``self.changes``, coalesced over
+        ``change_window`` seconds.
+        """
         self.db_path = db_path
-        self._callbacks: List[Callable[[], None]] = []
+        self.changes = ChangeBus(window=change_window)
+        self._pool: ConnectionManager | None = (
+            ConnectionManager(db_path, read_pool_size=read_pool_size) if persistent else None
+        )
+        self._data_version: int | None = None
+        self._rows = RowCache()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection whose changes are committed on exit."""
+        if self._pool is not None:
+            with metrics.timer("db.write"), self._pool.writer() as conn:
+                yield conn
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with metrics.timer("db.write"), conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection for read-only queries."""
+        if self._pool is not None:
+            with metrics.timer("db.read"), self._pool.reader() as conn:
+                yield conn
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with metrics.timer("db.read"):
+                yield conn
+        finally:
+            conn.close()
+
+    def writer(self) -> ContextManager[sqlite3.Connection]:
+        """Write transaction for companion stores that share this database file."""
+        return self._write()
+
+    def reader(self) -> ContextManager[sqlite3.Connection]:
+        """Read connection for companion stores that share this database file."""
+        return self._read()
+
+    def close(self) -> None:
+        """Release pooled connections, if any."""
+        if self._pool is not None:
+            self._pool.close()
 
     def init_db(self) -> None:
         logging.info("Initializing database...")
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS problems (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    grp TEXT,
-                    url TEXT,
-                    slug TEXT UNIQUE,
-                    solved INTEGER DEFAULT 0,
-                    time_spent INTEGER DEFAULT 0,
-                    save_note_on_solve INTEGER DEFAULT 0,
-                    note_path TEXT
-                )
-                '''
-            )
-            cursor = conn.execute("SELECT COUNT(*) FROM problems")
-            count = cursor.fetchone()[0]
-        logging.info(f"Database initialized. Found {count} problems")
+        with self._write() as conn:
+            version = migrate(conn)
+            restore_deferred_schema(conn)  # In case a bulk import was interrupted
+        # No COUNT(*) here: it walks the whole table on every launch.
+        logging.info(f"Database initialized at schema version {version}")
+
+    # Filter shapes the screens generate; each must be answered from an index.
+    # The unfiltered listing is absent on purpose: it walks the rowid B-tree
+    # backwards, which EXPLAIN reports as a plain SCAN but is already ordered.
+    PLAN_CHECK_FILTERS: tuple[dict[str, Any], ...] = (
+        {"solved": False},
+        {"solved": True},
+        {"grp": "", "solved": False},
+        {"url": ""},
+    )
+
+    def explain_query_plan(self, sql: str, params: list[Any] | tuple = ()) -> list[tuple]:
+        with self._read() as conn:
+            return conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+
+    def check_query_plans(self) -> dict[str, list[str]]:
+        """
+        Run EXPLAIN QUERY PLAN over the queries load_problems and
+        load_problems_page build for PLAN_CHECK_FILTERS and return
+        ``{sql: [offending plan details]}`` for any that fall back to a
+        full scan or a temporary sort. An empty dict means no regressions.
+        """
+        problems = {}
+        for filters in self.PLAN_CHECK_FILTERS:
+            for after_id in (None, 1):
+                sql, params = self._page_query(filters, 1, after_id)
+                bad = full_scans(self.explain_query_plan(sql, params))
+                if bad:
+                    problems[sql] = bad
+        return problems
+
+    def subscribe(self, subscriber: Subscriber) -> Callable[[], None]:
+        """Receive coalesced lists of Change; returns an unsubscribe function."""
+        return self.changes.subscribe(subscriber)
 
     def register_callback(self, callback: Callable[[], None]) -> None:
-        """Register a callback to be called on database updates."""
-        self._callbacks.append(callback)
+        """Register a callback to be called (without deltas) after database updates."""
+        self.changes.subscribe(lambda changes: callback())
+
+    def _publish(self, kind: str, ids: Iterable[int], columns: Iterable[str] = ()) -> None:
+        self.changes.publish(kind, ids, columns)
 
-    def _trigger_callbacks(self) -> None:
-        """Trigger all registered callbacks."""
-        for callback in self._callbacks:
-            try:
-                callback()
-            except Exception as e:
-                logging.error(f"Error in callback: {e}")
+    def check_external_changes(self) -> bool:
+        """
+        Publish an EXTERNAL change and return True if another process has
+        committed since the previous call. This is one PRAGMA on the writer
+        connection, cheap enough to poll; it needs ``persistent=True``.
+        """
+        if self._pool is None:
+            return False
+        version = self._pool.data_version()
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        if changed:
+            self._rows.invalidate()
+            self.changes.publish_external()
+        return changed
 
     def create_problem(self, name: str, grp: str, url: str, slug: str) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
+        with self._write() as conn:
+            cursor = conn.execute(
                 "INSERT INTO problems (name, grp, url, slug) VALUES (?, ?, ?, ?)",
                 (name, grp, url, slug)
             )
-        self._trigger_callbacks()
+        self._publish(INSERT, [cursor.lastrowid])
 
-    def save_problem(self, name: str, grp: str, url: str, slug: str, solved: int = 0, save_note_on_solve: int = 0, note_path: str="") -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                "SELECT id FROM problems WHERE slug = ?",
-                (slug,)
+    def save_problem(self, name: str, grp: str, url: str, slug: str, solved: int = 0, save_note_on_solve: int = 0, note_path: str="",
+                     time_limit: int = 0, memory_limit: int = 0, tests: list[tuple[str, str]] | None = None) -> str:
+        """
+        Insert a problem, or refresh it if its URL is already known (its slug
+        when it has no URL). Returns the slug it is stored under, which gets
+        a suffix when another problem already uses ``slug``.
+        """
+        with self._write() as conn:
+            stored_slug, change = self._save_problem_row(
+                conn, name, grp, url, slug, solved, save_note_on_solve, note_path,
+                time_limit, memory_limit, tests, last_id=self._last_problem_id(conn)
             )
-            if cursor.fetchone():
-                conn.execute(
-                    "UPDATE problems SET name = ?, grp = ?, url = ?, solved = ?, save_note_on_solve = ?, note_path = ? WHERE slug = ?",
-                    (name, grp, url, solved, save_note_on_solve, note_path, slug )
-                )
+        if change:
+            self._rows.invalidate([stored_slug])
+            self._publish(*change)
+        return stored_slug
+
+    def save_problems(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Save several problems in one transaction and notify listeners once.
+        Each row takes the keyword arguments of ``save_problem``.
+        """
+        if not rows:
+            return
+        changes = []
+        changed_slugs = []
+        with self._write() as conn:
+            last_id = self._last_problem_id(conn)
+            for row in rows:
+                stored_slug, change = self._save_problem_row(conn, **row, last_id=last_id)
+                if change:
+                    changes.append(change)
+                    changed_slugs.append(stored_slug)
+        self._rows.invalidate(changed_slugs)
+        for change in changes:
+            self._publish(*change)
+
+    _SAVED_COLUMNS = ("name", "grp", "url", "slug", "solved", "save_note_on_solve", "note_path",
+                      "time_limit", "memory_limit")
+    # What a re-sent payload may change; progress (solved, notes) is kept.
+    _PAYLOAD_COLUMNS = ("name", "grp", "time_limit", "memory_limit")
+
+    def _last_problem_id(self, conn: sqlite3.Connection) -> int:
+        # problems uses AUTOINCREMENT, so any id above this was inserted later.
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'problems'").fetchone()
+        return row[0] if row else 0
+
+    def _upsert_sql(self, target: str) -> str:
+        payload = ", ".join(self._PAYLOAD_COLUMNS)
+        return (
+            f"INSERT INTO problems ({', '.join(self._SAVED_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self._SAVED_COLUMNS))}) "
+            f"ON CONFLICT ({target}) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in self._PAYLOAD_COLUMNS)
+            + f" WHERE ({payload}) IS NOT ({', '.join(f'excluded.{col}' for col in self._PAYLOAD_COLUMNS)})"
+            " RETURNING id, slug"
+        )
+
+    def _save_problem_row(self, conn: sqlite3.Connection, name: str, grp: str, url: str, slug: str,
+                          solved: int = 0, save_note_on_solve: int = 0, note_path: str = "",
+                          time_limit: int = 0, memory_limit: int = 0,
+                          tests: list[tuple[str, str]] | None = None, *,
+                          last_id: int) -> tuple[str, tuple[str, list[int], set[str]] | None]:
+        """
+        Upsert one row in a single statement, keyed by URL (by slug when
+        there is no URL). Returns the stored slug and the (kind, ids,
+        columns) delta, or None when nothing changed. ``last_id`` is
+        ``_last_problem_id`` from before the transaction's first upsert.
+        ``tests`` ((input_hash, output_hash) pairs), when given, replaces the
+        problem's stored sample tests.
+        """
+        url = url or None  # The URL index is UNIQUE; NULLs never conflict, '' would.
+        target = "url" if url else "slug"
+        values = [name, grp, url, slug, solved, save_note_on_solve, note_path, time_limit, memory_limit]
+        try:
+            row = conn.execute(self._upsert_sql(target), values).fetchone()
+        except sqlite3.IntegrityError:
+            if target != "url":
+                raise
+            # A different problem (another URL) already has this slug, e.g.
+            # two contests with an "A. Sum": keep both under distinct slugs.
+            unique = unique_slug(slug, url)
+            values[3] = unique
+            if note_path.endswith(f"{slug}.md"):
+                values[6] = note_path[:-len(f"{slug}.md")] + f"{unique}.md"
+            row = conn.execute(self._upsert_sql(target), values).fetchone()
+        if row is None:
+            # Known problem, nothing to refresh; its tests may still be new.
+            pid, stored_slug = conn.execute(
+                f"SELECT id, slug FROM problems WHERE {target} = ?", (values[2] if url else slug,)
+            ).fetchone()
+            change = None
+        else:
+            pid, stored_slug = row
+            if pid > last_id:
+                change = (INSERT, [pid], set())
             else:
-                conn.execute(
-                    "INSERT INTO problems (name, grp, url, slug, solved, save_note_on_solve, note_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (name, grp, url, slug, solved, save_note_on_solve, note_path)
-                )
-        self._trigger_callbacks()
+                change = (UPDATE, [pid], set(self._PAYLOAD_COLUMNS))
+        if tests is not None:
+            self._replace_tests(conn, stored_slug, tests)
+        return stored_slug, change
 
-    def load_problems(self, filters: dict[str, Any] = None) -> list[tuple]:
-        filters = filters or {}
-        sql = "SELECT id, name, grp, solved FROM problems"
+    def _filter_clauses(self, filters: dict[str, Any], prefix: str = "") -> tuple[list[str], list[Any]]:
         clauses = []
         params = []
         for key, value in filters.items():
             if key == "solved":
-                clauses.append("solved = ?")
+                clauses.append(f"{prefix}solved = ?")
                 params.append(1 if value else 0)
             elif key == "name_like":
-                clauses.append("name LIKE ?")
+                clauses.append(f"{prefix}name LIKE ?")
                 params.append(f"%{value}%")
             else:
-                clauses.append(f"{key} = ?")
+                clauses.append(f"{prefix}{key} = ?")
                 params.append(value)
+        return clauses, params
+
+    def load_problems(self, filters: dict[str, Any] = None) -> list[tuple]:
+        filters = filters or {}
+        sql = "SELECT id, name, grp, solved FROM problems"
+        clauses, params = self._filter_clauses(filters)
         if clauses:
             sql += " WHERE " + " AND ".join(clauses)
         sql += " ORDER BY id DESC"
-        with sqlite3.connect(self.db_path) as conn:
+        with self._read() as conn:
             return conn.execute(sql, params).fetchall()
 
+    def load_problems_page(self, filters: dict[str, Any] = None, page_size: int = 200,
+                           after_id: int | None = None) -> list[tuple]:
+        """
+        Return at most ``page_size`` rows ordered by id descending, starting
+        strictly after ``after_id`` (the last id of the previous page).
+        """
+        sql, params = self._page_query(filters or {}, page_size, after_id)
+        with self._read() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _page_query(self, filters: dict[str, Any], page_size: int,
+                    after_id: int | None) -> tuple[str, list[Any]]:
+        sql = "SELECT id, name, grp, solved FROM problems"
+        clauses, params = self._filter_clauses(filters)
+        if after_id is not None:
+            clauses.append("id < ?")
+            params.append(after_id)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(page_size)
+        return sql, params
+
+    def iter_problem_pages(self, filters: dict[str, Any] = None, page_size: int = 200,
+                           after_id: int | None = None) -> Iterator[list[tuple]]:
+        """
+        Yield successive pages from ``load_problems_page`` until exhausted.
+
+        Each page is its own keyset query, so no cursor is held open between
+        pages and the cost of a page does not depend on how far in it is.
+        """
+        while True:
+            page = self.load_problems_page(filters, page_size, after_id)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def load_group_page(self, grp: str, filters: dict[str, Any] = None, page_size: int = 200,
+                        after_id: int | None = None) -> list[tuple]:
+        """
+        Like ``load_problems_page`` but limited to one group, as keyed in
+        ``group_stats`` ('' also covers problems with no group).
+        """
+        clauses, params = self._filter_clauses(filters or {})
+        clauses.insert(0, "(grp = ? OR grp IS NULL)" if grp == "" else "grp = ?")
+        params.insert(0, grp)
+        if after_id is not None:
+            clauses.append("id < ?")
+            params.append(after_id)
+        sql = f"SELECT id, name, grp, solved FROM problems WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?"
+        with self._read() as conn:
+            return conn.execute(sql, [*params, page_size]).fetchall()
+
+    def finder_rows(self, ids: Iterable[int] | None = None) -> list[tuple]:
+        """Return ``(id, name, grp, url)`` for ``ids``, or for every problem, to feed FuzzyIndex."""
+        sql = "SELECT id, name, grp, url FROM problems"
+        params: list[Any] = []
+        if ids is not None:
+            sql += " WHERE id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(ids)))
+        with self._read() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def group_stats(self) -> list[tuple[str, int, int, int]]:
+        """
+        Return ``(group, total, solved, seconds)`` for every group, by name.
+        Reads the trigger-maintained summary, so the cost depends on the
+        number of groups rather than problems.
+        """
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT grp, total, solved, CAST(time_spent AS INTEGER) FROM group_stats ORDER BY grp"
+            ).fetchall()
+
+    def load_problems_by_ids(self, ids: Iterable[int], filters: dict[str, Any] = None) -> list[tuple]:
+        """Return the list rows for ``ids`` that match ``filters``, newest first."""
+        ids = list(ids)
+        if not ids:
+            return []
+        clauses, params = self._filter_clauses(filters or {})
+        clauses.insert(0, f"id IN ({', '.join('?' * len(ids))})")
+        sql = "SELECT id, name, grp, solved FROM problems WHERE " + " AND ".join(clauses) + " ORDER BY id DESC"
+        with self._read() as conn:
+            return conn.execute(sql, [*ids, *params]).fetchall()
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Quote each word of free text for MATCH; the last word matches as a prefix."""
+        terms = re.findall(r"\w+", text)
+        if not terms:
+            return ""
+        quoted = [f'"{t}"' for t in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search_problems(self, query: str, filters: dict[str, Any] = None, limit: int = 100,
+                        highlight: tuple[str, str] = ("[", "]")) -> list[tuple]:
+        """
+        Full-text search over name, group and note body, best matches first.
+
+        Returns (id, name, grp, solved, snippet) where the snippet is taken
+        from whichever column matched best, with hits wrapped in ``highlight``.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        clauses, params = self._filter_clauses(filters or {}, prefix="p.")
+        sql = (
+            "SELECT p.id, p.name, p.grp, p.solved, "
+            "snippet(problems_fts, -1, ?, ?, '…', 10) "
+            "FROM problems_fts JOIN problems p ON p.id = problems_fts.rowid "
+            "WHERE problems_fts MATCH ?"
+        )
+        if clauses:
+            sql += " AND " + " AND ".join(clauses)
+        sql += " ORDER BY bm25(problems_fts, 10.0, 4.0, 1.0) LIMIT ?"
+        with self._read() as conn:
+            return conn.execute(sql, [highlight[0], highlight[1], match, *params, limit]).fetchall()
+
+    def update_note_body(self, slug: str, body: str) -> None:
+        """Refresh the indexed note text for a problem after its note file is written."""
+        with self._write() as conn:
+            # FTS5 tables don't support RETURNING; look the rowid up first.
+            ids = self._problem_ids(conn, slug)
+            conn.executemany("UPDATE problems_fts SET body = ? WHERE rowid = ?", [(body, pid) for pid in ids])
+        self._publish(UPDATE, ids, ["body"])
+
     def get_problem(self, problem_id: int) -> tuple | None:
         """
         Return (slug, name, solved, save_note_on_solve) for the given problem ID, or None if not found.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        record = self.get_problem_full(problem_id)
+        return (record.slug, record.name, record.solved, record.save_note_on_solve) if record else None
+
+    def get_problem_full(self, key: int | str) -> ProblemRecord | None:
+        """
+        Return the whole row for a problem id or slug, with its tracked
+        time, or None if not found. Rows are served from an LRU cache that
+        every write method invalidates for the slugs it touches.
+        """
+        record = self._rows.get(key)
+        if record is not None:
+            metrics.count("db.row_cache.hit")
+            return record
+        metrics.count("db.row_cache.miss")
+        generation = self._rows.generation
+        column = "id" if isinstance(key, int) else "slug"
+        with self._read() as conn:
             row = conn.execute(
-                "SELECT slug, name, solved, save_note_on_solve FROM problems WHERE id = ?",
-                (problem_id,)
+                "SELECT id, slug, name, grp, IFNULL(url, legacy_url), solved, save_note_on_solve, note_path, "
+                "IFNULL(time_limit, 0), IFNULL(memory_limit, 0), "
+                "(SELECT CAST(IFNULL(SUM(duration), 0) AS INTEGER) FROM sessions s WHERE s.slug = p.slug) "
+                f"FROM problems p WHERE {column} = ?",
+                (key,)
             ).fetchone()
-            return row if row else None
+        if row is None:
+            return None
+        record = ProblemRecord(*row)
+        self._rows.put(record, generation)
+        return record
+
+    def invalidate_rows(self, slugs: Iterable[str] | None = None) -> None:
+        """
+        Drop cached rows for ``slugs``, or all of them. Needed only after
+        writing to ``problems`` or ``sessions`` through ``writer()``.
+        """
+        self._rows.invalidate(slugs)
 
     def update_problem(self, slug: str, **fields) -> None:
         if not fields:
@@ -108,80 +517,157 @@ class ProblemDatabase:
             cols.append(f"{key} = ?")
             vals.append(value)
         vals.append(slug)
-        sql = f"UPDATE problems SET {', '.join(cols)} WHERE slug = ?"
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(sql, vals)
+        sql = f"UPDATE problems SET {', '.join(cols)} WHERE slug = ? RETURNING id"
+        with self._write() as conn:
+            ids = [row[0] for row in conn.execute(sql, vals).fetchall()]
+        self._rows.invalidate([slug])
+        self._publish(UPDATE, ids, fields)
 
     def delete_problem(self, slug: str) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "DELETE FROM problems WHERE slug = ?",
+        with self._write() as conn:
+            conn.execute("DELETE FROM problem_tests WHERE slug = ?", (slug,))
+            conn.execute("DELETE FROM sessions WHERE slug = ?", (slug,))
+            ids = [row[0] for row in conn.execute(
+                "DELETE FROM problems WHERE slug = ? RETURNING id",
                 (slug,)
-            )
-        self._trigger_callbacks()
+            ).fetchall()]
+        self._rows.invalidate([slug])
+        self._publish(DELETE, ids)
 
     def get_url(self, slug: str) -> str | None:
         """
         Return the URL for the given problem slug, or None if not found.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT url FROM problems WHERE slug = ?",
+        record = self.get_problem_full(slug)
+        return record.url if record else None
+
+    def _replace_tests(self, conn: sqlite3.Connection, slug: str, tests: list[tuple[str, str]]) -> None:
+        conn.execute("DELETE FROM problem_tests WHERE slug = ?", (slug,))
+        conn.executemany(
+            "INSERT INTO problem_tests (slug, idx, input_hash, output_hash) VALUES (?, ?, ?, ?)",
+            [(slug, i, input_hash, output_hash) for i, (input_hash, output_hash) in enumerate(tests, 1)]
+        )
+
+    def get_problem_tests(self, slug: str) -> list[tuple[int, str, str]]:
+        """Return (idx, input_hash, output_hash) for the problem's stored tests."""
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT idx, input_hash, output_hash FROM problem_tests WHERE slug = ? ORDER BY idx",
                 (slug,)
-            ).fetchone()
-            return row[0] if row else None
+            ).fetchall()
+
+    def test_blob_hashes(self) -> set[str]:
+        """Every blob digest still referenced by some problem, for BlobStore.gc."""
+        with self._read() as conn:
+            rows = conn.execute("SELECT input_hash FROM problem_tests UNION SELECT output_hash FROM problem_tests")
+            return {row[0] for row in rows}
+
+    def get_limits(self, slug: str) -> tuple[int, int]:
+        """
+        Return (time_limit in ms, memory_limit in MB) for the problem; 0 means
+        the judge did not send one.
+        """
+        record = self.get_problem_full(slug)
+        return (record.time_limit, record.memory_limit) if record else (0, 0)
 
     def get_save_note_on_solve(self, slug: str) -> int:
         """
         Return the save_note_on_solve flag for the given problem slug.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT save_note_on_solve FROM problems WHERE slug = ?",
-                (slug,)
-            ).fetchone()
-            return row[0] if row else 0
-        self._trigger_callbacks()
+        record = self.get_problem_full(slug)
+        return record.save_note_on_solve if record else 0
 
     def mark_solved(self, slug: str) -> None:
         """
         Mark the problem as solved by setting solved=1.
         """
         self.update_problem(slug, solved=1)
-        self._trigger_callbacks()
 
-    def increment_time_spent(self, slug: str, seconds: int) -> None:
+    def _problem_ids(self, conn: sqlite3.Connection, slug: str) -> list[int]:
+        return [row[0] for row in conn.execute("SELECT id FROM problems WHERE slug = ?", (slug,))]
+
+    def record_session(self, slug: str, started_at: float, duration: float) -> None:
         """
-        Increment the time spent on a problem by a given number of seconds.
+        Record a timing session that began at ``started_at`` (Unix time) and
+        has lasted ``duration`` seconds so far. Calling it again with the
+        same start time updates that session, so a running session can be
+        checkpointed.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._write() as conn:
             conn.execute(
-                "UPDATE problems SET time_spent = time_spent + ? WHERE slug = ?",
-                (seconds, slug)
+                "INSERT INTO sessions (slug, started_at, duration) VALUES (?, ?, ?) "
+                "ON CONFLICT (slug, started_at) DO UPDATE SET duration = excluded.duration",
+                (slug, started_at, duration)
             )
-        self._trigger_callbacks()
+            ids = self._problem_ids(conn, slug)
+        self._rows.invalidate([slug])
+        self._publish(UPDATE, ids, ["time_spent"])
+
+    def increment_time_spent(self, slug: str, seconds: int) -> None:
+        """
+        Increment the time spent on a problem by a given number of seconds.
+        """
+        self.record_session(slug, time.time() - seconds, seconds)
 
     def get_time_spent(self, slug: str) -> int:
         """
-        Retrieve the time spent on a problem.
+        Retrieve the time spent on a problem, summed over its sessions.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        record = self.get_problem_full(slug)
+        if record is not None:
+            return record.time_spent
+        with self._read() as conn:
             row = conn.execute(
-                "SELECT time_spent FROM problems WHERE slug = ?",
+                "SELECT COALESCE(SUM(duration), 0) FROM sessions WHERE slug = ?",
                 (slug,)
             ).fetchone()
-            return row[0] if row else 0
+            return int(row[0])
 
     def update_time_spent(self, slug: str, time_spent: int) -> None:
         """
         Update the time spent on a problem by setting it to a specific value.
+        The session history is replaced by a single undated session.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "UPDATE problems SET time_spent = ? WHERE slug = ?",
-                (time_spent, slug)
-            )
-        self._trigger_callbacks()
+        with self._write() as conn:
+            conn.execute("DELETE FROM sessions WHERE slug = ?", (slug,))
+            if time_spent > 0:
+                conn.execute(
+                    "INSERT INTO sessions (slug, started_at, duration) VALUES (?, NULL, ?)",
+                    (slug, time_spent)
+                )
+            ids = self._problem_ids(conn, slug)
+        self._rows.invalidate([slug])
+        self._publish(UPDATE, ids, ["time_spent"])
+
+    def time_by_day(self, slug: str | None = None, since: float | None = None) -> list[tuple[str, int]]:
+        """
+        Return ``(YYYY-MM-DD, seconds)`` per local day, oldest first. A
+        session counts towards the day it started on; undated sessions are
+        left out.
+        """
+        clauses = ["started_at IS NOT NULL"]
+        params: list[Any] = []
+        if slug is not None:
+            clauses.append("slug = ?")
+            params.append(slug)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        with self._read() as conn:
+            rows = conn.execute(
+                "SELECT date(started_at, 'unixepoch', 'localtime') AS day, CAST(SUM(duration) AS INTEGER) "
+                f"FROM sessions WHERE {' AND '.join(clauses)} GROUP BY day ORDER BY day",
+                params
+            ).fetchall()
+        return rows
+
+    def time_by_group(self) -> list[tuple[str, int]]:
+        """Return ``(group, seconds)`` for every group with tracked time, largest first."""
+        with self._read() as conn:
+            return conn.execute(
+                "SELECT grp, CAST(time_spent AS INTEGER) FROM group_stats "
+                "WHERE time_spent >= 1 ORDER BY time_spent DESC"
+            ).fetchall()
 
 
 
@@ -0,0 +1,145 @@
+# finder.py
+"""
+In-memory trigram index for jumping to a problem by a rough description:
+typos and words in any order ("castle def 954") still find
+"C. Castle Defense" in "Codeforces Round 954".
+
+Each problem is indexed by the words of its name, its group and the
+contest id in its URL. A query keeps the problems sharing at least half of
+its trigrams, then ranks them by the rarity of the trigrams they share plus
+a bonus for query words that are whole words of the problem.
+"""
+import heapq
+import math
+import re
+from typing import Iterable, NamedTuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CONTEST = re.compile(r"/(?:contests?|gym|problemset/problem|problem)/([A-Za-z0-9_]+)")
+
+# Fraction of a query's distinct trigrams a problem must share to be scored.
+MIN_SHARED = 0.5
+# Extra score per query word that is a whole word of the problem, relative to
+# a full trigram match.
+WORD_BONUS = 0.5
+# Problems scored per query at most. Postings are read rarest first, so the
+# ones left out share only the most common trigrams of the query; within the
+# posting that overflows, the newest problems are kept.
+MAX_CANDIDATES = 1000
+
+
+def contest_id(url: str | None) -> str:
+    """Return the contest part of a judge URL (``954``, ``abc123``), or ''."""
+    if not url:
+        return ""
+    match = _CONTEST.search(url)
+    return match.group(1) if match else ""
+
+
+def _trigrams(words: Iterable[str]) -> set[str]:
+    grams = set()
+    for word in words:
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FinderHit(NamedTuple):
+    score: float
+    problem_id: int
+    label: str
+
+
+class FuzzyIndex:
+    """
+    Trigram postings over ``(id, name, grp, url)`` rows.
+
+    Not thread-safe: build one off the event loop with ``add``, then only
+    touch it from the loop.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, set[int]] = {}
+        self._grams: dict[int, frozenset[str]] = {}
+        self._words: dict[int, frozenset[str]] = {}
+        self._labels: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple]) -> "FuzzyIndex":
+        index = cls()
+        for row in rows:
+            index.add(*row)
+        return index
+
+    def add(self, problem_id: int, name: str, grp: str | None, url: str | None) -> None:
+        """Index a problem, replacing any previous entry for ``problem_id``."""
+        if problem_id in self._labels:
+            self.remove(problem_id)
+        contest = contest_id(url)
+        label = f"{grp} / {name}" if grp else name
+        words = _WORD.findall(f"{name} {grp or ''} {contest}".lower())
+        grams = frozenset(_trigrams(words))
+        self._labels[problem_id] = label
+        self._words[problem_id] = frozenset(words)
+        self._grams[problem_id] = grams
+        postings = self._postings
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = {problem_id}
+            else:
+                ids.add(problem_id)
+
+    def remove(self, problem_id: int) -> None:
+        grams = self._grams.pop(problem_id, None)
+        if grams is None:
+            return
+        del self._labels[problem_id]
+        del self._words[problem_id]
+        for gram in grams:
+            ids = self._postings[gram]
+            ids.discard(problem_id)
+            if not ids:
+                del self._postings[gram]
+
+    def search(self, query: str, limit: int = 20) -> list[FinderHit]:
+        """Return up to ``limit`` hits for ``query``, best first."""
+        words = _WORD.findall(query.lower())
+        if not words or not self._labels:
+            return []
+        total = len(self._labels)
+        postings = self._postings
+        # Rarest first; trigrams no problem has still count against the match.
+        grams = sorted(_trigrams(words), key=lambda gram: (len(postings.get(gram, ())), gram))
+        weights = {gram: math.log((total + 1) / (len(postings.get(gram, ())) + 0.5)) for gram in grams}
+        query_weight = sum(weights.values())
+        # A problem sharing at least `needed` trigrams must be in one of the
+        # len(grams) - needed + 1 rarest posting lists, so only those are read.
+        needed = max(1, math.ceil(len(grams) * MIN_SHARED))
+        candidates: set[int] = set()
+        for gram in grams[:len(grams) - needed + 1]:
+            ids = postings.get(gram, ())
+            room = MAX_CANDIDATES - len(candidates)
+            candidates.update(ids if len(ids) <= room else heapq.nlargest(room, ids - candidates))
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        query_grams = frozenset(grams)
+        query_words = frozenset(words)
+        doc_grams = self._grams
+        doc_words = self._words
+        weight = weights.__getitem__
+        bonus = WORD_BONUS / len(query_words)
+
+        def score(problem_id: int) -> float:
+            shared = query_grams & doc_grams[problem_id]
+            if len(shared) < needed:
+                return 0.0
+            value = sum(map(weight, shared)) / query_weight
+            return value + bonus * len(query_words & doc_words[problem_id])
+
+        scored = ((score(problem_id), problem_id) for problem_id in candidates)
+        best = heapq.nlargest(limit, (hit for hit in scored if hit[0] > 0))
+        return [FinderHit(value, problem_id, self._labels[problem_id]) for value, problem_id in best]
@@ -0,0 +1,341 @@
+# ingest.py
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from blobstore import BlobStore
+from utils import sanitize
+
+logger = logging.getLogger(__name__)
+
+NOTES_DIR = Path("notes")
+SPOOL_PATH = Path("ingest.spool")
+
+
+@dataclass
+class _PendingBatch:
+    size: int
+    payloads: list[dict] = field(default_factory=list)
+    arrived: int = 0  # Includes repeats that were dropped
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class RecentPayloads:
+    """
+    Bounded set of the digests of payloads accepted in the last ``ttl``
+    seconds, for dropping repeated sends (a double-clicked "parse contest")
+    before they reach the disk. A send after ``ttl`` is taken as deliberate
+    and goes through. The ``batch`` field is ignored, since a repeat comes
+    in a new batch.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._seen: "OrderedDict[bytes, float]" = OrderedDict()  # digest -> expiry, oldest first
+
+    @staticmethod
+    def digest(payload: dict) -> bytes:
+        content = {key: value for key, value in payload.items() if key != "batch"}
+        encoded = json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).digest()
+
+    def _expire(self, now: float) -> None:
+        while self._seen and next(iter(self._seen.values())) <= now:
+            self._seen.popitem(last=False)
+
+    def seen(self, payload: dict) -> bool:
+        """Return True if ``payload`` was added within the last ``ttl`` seconds."""
+        self._expire(time.monotonic())
+        return self.digest(payload) in self._seen
+
+    def add(self, payload: dict) -> None:
+        """Record ``payload`` as accepted; call once it is spooled."""
+        key = self.digest(payload)
+        self._seen[key] = time.monotonic() + self.ttl
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+
+    def discard(self, payload: dict) -> None:
+        """Forget ``payload``, e.g. after saving it failed, so a re-send is not dropped."""
+        self._seen.pop(self.digest(payload), None)
+
+
+class BatchCollector:
+    """
+    Group Competitive Companion payloads by ``batch.id``.
+
+    ``on_batch`` is called once per batch with all of its payloads, as soon
+    as ``batch.size`` payloads have arrived or ``timeout`` seconds pass
+    without a new one. Payloads without a batch are passed on alone.
+    """
+
+    def __init__(self, on_batch: Callable[[list[dict]], None], timeout: float = 3.0):
+        self.on_batch = on_batch
+        self.timeout = timeout
+        self._pending: dict[str, _PendingBatch] = {}
+
+    def add(self, payload: dict, *, keep: bool = True) -> None:
+        """
+        Add ``payload`` to its batch. With ``keep=False`` it only counts
+        towards the batch size (a dropped repeat), so a batch that is
+        partly re-sent still completes without waiting for the timeout.
+        """
+        batch = payload.get("batch") or {}
+        batch_id = batch.get("id")
+        size = batch.get("size") or 1
+        if not batch_id or size <= 1:
+            if keep:
+                self._emit([payload])
+            return
+        pending = self._pending.get(batch_id)
+        if pending is None:
+            pending = self._pending[batch_id] = _PendingBatch(size)
+        pending.arrived += 1
+        if keep:
+            pending.payloads.append(payload)
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+        if pending.arrived >= pending.size:
+            del self._pending[batch_id]
+            self._emit(pending.payloads)
+        else:
+            loop = asyncio.get_running_loop()
+            pending.timer = loop.call_later(self.timeout, self._expire, batch_id)
+
+    def _expire(self, batch_id: str) -> None:
+        pending = self._pending.pop(batch_id, None)
+        if pending is None:
+            return
+        logger.warning(
+            f"Batch {batch_id} timed out with {len(pending.payloads)}/{pending.size} problems"
+        )
+        self._emit(pending.payloads)
+
+    @property
+    def pending(self) -> int:
+        """Payloads held back while their batch is incomplete."""
+        return sum(len(batch.payloads) for batch in self._pending.values())
+
+    def flush(self) -> None:
+        """Emit every incomplete batch now, e.g. before shutting down."""
+        for batch_id in list(self._pending):
+            pending = self._pending.pop(batch_id)
+            if pending.timer is not None:
+                pending.timer.cancel()
+            self._emit(pending.payloads)
+
+    def _emit(self, payloads: list[dict]) -> None:
+        if not payloads:
+            return
+        try:
+            self.on_batch(payloads)
+        except Exception as e:
+            logger.error(f"Error handling batch of {len(payloads)} problems: {e}")
+
+
+class SpoolLocked(Exception):
+    """Another process (the daemon or a second TUI) owns the spool."""
+
+
+class Spool:
+    """
+    Append-only NDJSON log of accepted payloads that are not saved yet.
+
+    ``append`` returns once the line is fsynced; concurrent appends share
+    one fsync. When every appended payload has been reported ``done`` the
+    file is truncated. Whatever is left after a crash is returned by
+    ``open`` for replay; replaying a saved payload again is harmless since
+    saves are upserts. An exclusive flock keeps one owner at a time.
+    """
+
+    def __init__(self, path: Path | str = SPOOL_PATH):
+        self.path = Path(path)
+        self._file = None
+        self._outstanding = 0
+        self._written = 0
+        self._synced = 0
+        self._sync_lock = asyncio.Lock()
+
+    def open(self) -> list[dict]:
+        """Lock the spool and return the payloads left over from last time."""
+        f = open(self.path, "a+", encoding="utf-8")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise SpoolLocked(f"{self.path} is in use by another process")
+        f.seek(0)
+        leftover = []
+        for number, line in enumerate(f, 1):
+            try:
+                leftover.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Most likely a line torn by the crash; it was never acknowledged.
+                logger.warning(f"Skipping unreadable line {number} of {self.path}")
+        self._file = f
+        self._outstanding = len(leftover)
+        return leftover
+
+    async def append(self, payload: dict) -> None:
+        self._file.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self._written += 1
+        self._outstanding += 1
+        target = self._written
+        async with self._sync_lock:
+            if self._synced >= target:
+                return  # An fsync that started after our write covered it.
+            upto = self._written
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+            self._synced = max(self._synced, upto)
+
+    def done(self, count: int) -> None:
+        """Mark ``count`` payloads as saved; truncate once nothing is outstanding."""
+        self._outstanding = max(self._outstanding - count, 0)
+        if self._outstanding == 0 and self._file is not None:
+            self._file.truncate(0)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class IngestQueue:
+    """
+    Bounded path from TCPServer to the database.
+
+    ``put`` (the server callback) waits for a free slot once ``max_pending``
+    payloads are in flight, so a burst slows its senders down instead of
+    growing memory. Each payload is spooled before ``put`` returns (and the
+    sender gets its 200), grouped by BatchCollector, and saved by a single
+    consumer task that hands every ready batch to ``save`` in one call.
+    With ``recent``, repeats of a payload that is already spooled are
+    acknowledged without taking a slot or touching the spool; a payload
+    whose save fails is forgotten again so that a re-send goes through.
+    """
+
+    def __init__(self, save: Callable[[list[dict]], Awaitable[None]], *,
+                 spool: Optional[Spool] = None, max_pending: int = 256,
+                 batch_timeout: float = 3.0, recent: Optional[RecentPayloads] = None):
+        self.save = save
+        self.spool = spool
+        self.recent = recent
+        self._slots = asyncio.Semaphore(max_pending)
+        self._batches = BatchCollector(self._on_batch, timeout=batch_timeout)
+        self._ready: list[dict] = []
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._consumer: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Replay anything the spool kept from a crash, then start consuming."""
+        if self.spool is not None:
+            try:
+                leftover = await asyncio.to_thread(self.spool.open)
+            except SpoolLocked as e:
+                logger.warning(f"{e}; ingesting without a spool")
+                self.spool = None
+            else:
+                if leftover:
+                    logger.info(f"Replaying {len(leftover)} spooled problems")
+                    try:
+                        await self.save(leftover)
+                    except Exception as e:
+                        logger.error(f"Error replaying spooled problems: {e}")
+                    else:
+                        self.spool.done(len(leftover))
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def put(self, payload: dict) -> None:
+        if self.recent is not None and self.recent.seen(payload):
+            logger.info("Dropped a repeated problem")
+            self._batches.add(payload, keep=False)
+            return
+        await self._slots.acquire()
+        try:
+            if self.spool is not None:
+                await self.spool.append(payload)
+        except BaseException:
+            self._slots.release()
+            raise
+        if self.recent is not None:
+            self.recent.add(payload)
+        self._idle.clear()
+        self._batches.add(payload)
+
+    def _on_batch(self, payloads: list[dict]) -> None:
+        self._ready.extend(payloads)
+        self._wake.set()
+
+    async def _consume(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            batch, self._ready = self._ready, []
+            try:
+                if batch:
+                    await self.save(batch)
+            except Exception as e:
+                # Left in the spool, so they are retried on the next start.
+                logger.error(f"Error saving {len(batch)} problems: {e}")
+                if self.recent is not None:
+                    for payload in batch:
+                        self.recent.discard(payload)
+            else:
+                if self.spool is not None:
+                    self.spool.done(len(batch))
+            for _ in batch:
+                self._slots.release()
+            if not self._ready and not self._batches.pending:
+                self._idle.set()
+
+    async def close(self) -> None:
+        """Emit open batches, wait until everything accepted is saved, then stop."""
+        self._batches.flush()
+        if self._consumer is not None:
+            await self._idle.wait()
+            self._consumer.cancel()
+            self._consumer = None
+        if self.spool is not None:
+            self.spool.close()
+
+
+def prepare_rows(payloads: list[dict], blobs: BlobStore, notes_dir: Path = NOTES_DIR) -> list[dict]:
+    """
+    Store the sample tests of incoming problems in ``blobs`` and build the
+    rows for ``ProblemDatabase.save_problems``. Note files are not touched:
+    they are created on the first save, so a re-sent problem keeps its
+    note. Does file I/O, so call it off the event loop.
+    """
+    rows = []
+    for data in payloads:
+        try:
+            name = data.get("name")
+            grp  = data.get("group")
+            url  = data.get("url")
+            slug = sanitize(name)
+            note_path = notes_dir / f"{slug}.md"
+            tests = [
+                (blobs.put(test.get("input", "")), blobs.put(test.get("output", "")))
+                for test in data.get("tests") or []
+            ]
+            rows.append(dict(name=name, grp=grp, url=url, slug=slug, solved=0, note_path=str(note_path),
+                             time_limit=data.get("timeLimit") or 0,
+                             memory_limit=data.get("memoryLimit") or 0,
+                             tests=tests))
+        except Exception as e:
+            logger.error(f"Error preparing problem {data.get('name')!r}: {e}")
+    return rows
@@ -0,0 +1,269 @@
+# judge.py
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import resource
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterator
+
+from blobstore import COMPRESSED_SUFFIX, BlobStore, open_blob
+
+logger = logging.getLogger(__name__)
+
+AC = "AC"
+WA = "WA"
+TLE = "TLE"
+MLE = "MLE"
+RE = "RE"
+
+DEFAULT_TIME_LIMIT_MS = 2000
+DEFAULT_MEMORY_LIMIT_MB = 256
+BUILD_DIR = Path(".build")
+# Allocation failures under RLIMIT_AS surface as crashes; these stderr markers
+# let them be reported as MLE instead of RE.
+OOM_MARKERS = (b"MemoryError", b"bad_alloc", b"out of memory", b"OutOfMemoryError")
+
+COMPILERS = {
+    ".cpp": ["g++", "-O2", "-std=c++17", "-o", "{out}", "{src}"],
+    ".cc": ["g++", "-O2", "-std=c++17", "-o", "{out}", "{src}"],
+    ".c": ["gcc", "-O2", "-o", "{out}", "{src}", "-lm"],
+    ".rs": ["rustc", "-O", "-o", "{out}", "{src}"],
+}
+INTERPRETERS = {
+    ".py": [sys.executable],
+}
+
+
+@dataclass(frozen=True)
+class TestCase:
+    name: str
+    input_path: Path
+    output_path: Path | None
+
+
+@dataclass(frozen=True)
+class TestResult:
+    name: str
+    verdict: str
+    time_ms: float
+    memory_kb: int
+    detail: str = ""
+
+
+class CompileError(Exception):
+    pass
+
+
+def stored_tests(store: BlobStore, rows: list[tuple[int, str, str]]) -> list[TestCase]:
+    """Build cases from ``get_problem_tests`` rows whose blobs are in ``store``."""
+    cases = []
+    for idx, input_hash, output_hash in rows:
+        input_path = store.path(input_hash)
+        if input_path is None:
+            logger.warning(f"Missing input blob {input_hash} for sample {idx}")
+            continue
+        cases.append(TestCase(f"sample-{idx}", input_path, store.path(output_hash)))
+    return cases
+
+
+def discover_tests(directory: Path) -> list[TestCase]:
+    """Pair every ``*.in`` in ``directory`` with a ``.out`` or ``.ans`` of the same stem."""
+    if not directory.is_dir():
+        return []
+    cases = []
+    for input_path in sorted(directory.glob("*.in")):
+        output_path = None
+        for suffix in (".out", ".ans"):
+            candidate = input_path.with_suffix(suffix)
+            if candidate.exists():
+                output_path = candidate
+                break
+        cases.append(TestCase(input_path.stem, input_path, output_path))
+    return cases
+
+
+def prepare_command(solution: Path | str) -> list[str]:
+    """
+    Turn a solution into the argv that runs it, compiling sources into
+    BUILD_DIR first. Builds are cached by source hash.
+    """
+    path = Path(solution)
+    suffix = path.suffix.lower()
+    if suffix in INTERPRETERS:
+        return [*INTERPRETERS[suffix], str(path)]
+    if suffix in COMPILERS:
+        digest = hashlib.blake2b(path.read_bytes(), digest_size=8).hexdigest()
+        out = BUILD_DIR / f"{path.stem}-{digest}"
+        if not out.exists():
+            BUILD_DIR.mkdir(parents=True, exist_ok=True)
+            argv = [arg.format(out=out, src=path) for arg in COMPILERS[suffix]]
+            if shutil.which(argv[0]) is None:
+                raise CompileError(f"{argv[0]} not found")
+            proc = subprocess.run(argv, capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise CompileError(proc.stderr.strip() or f"{argv[0]} exited with {proc.returncode}")
+        return [str(out.resolve())]
+    if os.access(path, os.X_OK):
+        return [str(path.resolve())]
+    return shlex.split(str(solution))
+
+
+def _tokens(stream: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """Yield whitespace-separated tokens from ``stream`` without reading it whole."""
+    carry = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parts = (carry + chunk).split()
+        if not chunk[-1:].isspace() and parts:
+            carry = parts.pop()
+        else:
+            carry = b""
+        yield from parts
+    if carry:
+        yield carry
+
+
+def outputs_match(actual: BinaryIO, expected: BinaryIO) -> tuple[bool, str]:
+    """Compare two streams token by token, ignoring differences in whitespace."""
+    index = 0
+    a_tokens = _tokens(actual)
+    e_tokens = _tokens(expected)
+    while True:
+        a = next(a_tokens, None)
+        e = next(e_tokens, None)
+        if a is None and e is None:
+            return True, ""
+        index += 1
+        if a != e:
+            got = a.decode(errors="replace")[:32] if a is not None else "EOF"
+            want = e.decode(errors="replace")[:32] if e is not None else "EOF"
+            return False, f"token {index}: expected {want!r}, got {got!r}"
+
+
+def _feed(path: Path, pipe: BinaryIO, chunk_size: int = 1 << 16) -> None:
+    try:
+        with open_blob(path) as source:
+            while chunk := source.read(chunk_size):
+                pipe.write(chunk)
+    except (BrokenPipeError, OSError):
+        pass  # The solution exited without reading all of its input.
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def run_case(command: list[str], case: TestCase, time_limit_ms: int,
+             memory_limit_mb: int) -> TestResult:
+    """
+    Run one test in a child process with RLIMIT_AS and RLIMIT_CPU set, a
+    wall-clock kill at twice the time limit, and stdout spooled to a temp
+    file that is then compared with the expected output as a stream.
+
+    The child's ru_maxrss starts at the RSS of the process that forks it,
+    so this must run in a small process, such as a Judge pool worker.
+    """
+    memory_bytes = memory_limit_mb * 1024 * 1024
+    cpu_seconds = max(1, -(-time_limit_ms // 1000))
+
+    def limit() -> None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+
+    compressed = case.input_path.suffix == COMPRESSED_SUFFIX
+    with open(case.input_path, "rb") as raw_input, tempfile.TemporaryFile() as stdout, \
+            tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        try:
+            # Plain inputs are handed over as a file descriptor; compressed
+            # ones are inflated into a pipe by a feeder thread.
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE if compressed else raw_input,
+                                    stdout=stdout, stderr=stderr, preexec_fn=limit)
+        except OSError as e:
+            return TestResult(case.name, RE, 0.0, 0, str(e))
+        feeder = None
+        if compressed:
+            feeder = threading.Thread(target=_feed, args=(case.input_path, proc.stdin), daemon=True)
+            feeder.start()
+        killer = threading.Timer(2 * time_limit_ms / 1000, proc.kill)
+        killer.start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            killer.cancel()
+            if feeder is not None:
+                feeder.join()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        memory_kb = usage.ru_maxrss
+
+        if elapsed_ms > time_limit_ms:
+            return TestResult(case.name, TLE, elapsed_ms, memory_kb)
+        if memory_kb * 1024 > memory_bytes:
+            return TestResult(case.name, MLE, elapsed_ms, memory_kb)
+        if proc.returncode != 0:
+            stderr.seek(max(stderr.tell() - 4096, 0))
+            tail = stderr.read()
+            if any(marker in tail for marker in OOM_MARKERS):
+                return TestResult(case.name, MLE, elapsed_ms, memory_kb)
+            last_line = tail.decode(errors="replace").strip().splitlines()[-1:] or [""]
+            return TestResult(case.name, RE, elapsed_ms, memory_kb,
+                              f"exit code {proc.returncode} {last_line[0][:80]}".strip())
+        if case.output_path is None:
+            return TestResult(case.name, AC, elapsed_ms, memory_kb, "no expected output")
+        stdout.seek(0)
+        with open_blob(case.output_path) as expected:
+            ok, detail = outputs_match(stdout, expected)
+        return TestResult(case.name, AC if ok else WA, elapsed_ms, memory_kb, detail)
+
+
+class Judge:
+    """
+    Run a solution against many tests in parallel across a process pool.
+
+    Workers come from a fork server rather than forking the caller: the
+    caller (the TUI) has threads that may hold locks at fork time, and its
+    heap would count towards every test's memory.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("forkserver"))
+        return self._pool
+
+    async def run(self, command: list[str], cases: list[TestCase],
+                  time_limit_ms: int = DEFAULT_TIME_LIMIT_MS,
+                  memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB) -> AsyncIterator[TestResult]:
+        """Yield results as tests finish, in completion order."""
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        futures = [
+            loop.run_in_executor(pool, run_case, command, case, time_limit_ms, memory_limit_mb)
+            for case in cases
+        ]
+        for future in asyncio.as_completed(futures):
+            yield await future
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
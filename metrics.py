@@ -0,0 +1,168 @@
+# metrics.py
+"""
+Process-wide timers, counters and histograms for the hot paths.
+
+Everything is a no-op until ``enable()`` is called (or CPNOTES_METRICS is
+set), so instrumented code pays one attribute lookup and a branch when
+metrics are off.
+"""
+import bisect
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with running count, sum and max."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (capped at max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": self.max,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._histograms: dict[str, Histogram] = {}
+        self._started = time.monotonic()
+        self._profiler: cProfile.Profile | None = None
+        self.profile_path: Path | None = None
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._started = time.monotonic()
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, value_ms: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(value_ms)
+
+    def timer(self, name: str) -> ContextManager[None]:
+        """Context manager recording the wall time of its block under ``name``."""
+        if not self.enabled:
+            return _NULL
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        """Decorator form of ``timer``."""
+        def decorate(fn: F) -> F:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+            return wrapper  # type: ignore[return-value]
+        return decorate
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "uptime_s": time.monotonic() - self._started,
+                "counters": dict(sorted(self._counters.items())),
+                "timers": {name: h.summary() for name, h in sorted(self._histograms.items())},
+            }
+
+    def dump(self, path: Path | str) -> None:
+        """Write the current snapshot as JSON to ``path``."""
+        path = Path(path)
+        path.write_text(json.dumps(self.snapshot(), indent=2), encoding="utf-8")
+        logger.info(f"Wrote metrics to {path}")
+
+    def start_profile(self, path: Path | str) -> None:
+        """
+        Start a cProfile capture of the calling thread (the event loop when
+        called from the app) that is saved to ``path`` by ``stop_profile``.
+        """
+        if self._profiler is not None:
+            return
+        self.profile_path = Path(path)
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profile(self) -> Path | None:
+        """Stop the capture, save it in pstats format and return its path."""
+        if self._profiler is None:
+            return None
+        self._profiler.disable()
+        path = self.profile_path
+        self._profiler.dump_stats(str(path))
+        self._profiler = None
+        self.profile_path = None
+        logger.info(f"Wrote profile to {path}")
+        return path
+
+
+metrics = Metrics()
+metrics.enable(bool(os.environ.get("CPNOTES_METRICS")))
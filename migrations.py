@@ -0,0 +1,371 @@
+# migrations.py
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _create_problems(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS problems (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            grp TEXT,
+            url TEXT,
+            slug TEXT UNIQUE,
+            solved INTEGER DEFAULT 0,
+            time_spent INTEGER DEFAULT 0,
+            save_note_on_solve INTEGER DEFAULT 0,
+            note_path TEXT
+        )
+        '''
+    )
+
+
+def _create_search_index(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS problems_fts USING fts5(
+            name, grp, body, tokenize = 'porter unicode61'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS problems_fts_ai AFTER INSERT ON problems BEGIN
+            INSERT INTO problems_fts(rowid, name, grp, body) VALUES (new.id, new.name, new.grp, '');
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS problems_fts_au AFTER UPDATE OF name, grp ON problems BEGIN
+            UPDATE problems_fts SET name = new.name, grp = new.grp WHERE rowid = new.id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS problems_fts_ad AFTER DELETE ON problems BEGIN
+            DELETE FROM problems_fts WHERE rowid = old.id;
+        END
+        """
+    )
+    # Index problems that predate the FTS table, including their note files.
+    missing = conn.execute(
+        "SELECT id, name, grp, note_path FROM problems "
+        "WHERE id NOT IN (SELECT rowid FROM problems_fts)"
+    ).fetchall()
+    for pid, name, grp, note_path in missing:
+        body = ""
+        if note_path and Path(note_path).is_file():
+            try:
+                body = Path(note_path).read_text()
+            except OSError as e:
+                logger.error(f"Could not read {note_path} for indexing: {e}")
+        conn.execute(
+            "INSERT INTO problems_fts(rowid, name, grp, body) VALUES (?, ?, ?, ?)",
+            (pid, name, grp, body)
+        )
+    if missing:
+        logger.info(f"Indexed {len(missing)} problems for full-text search")
+
+
+def _create_hot_indexes(conn: sqlite3.Connection) -> None:
+    # Covers the list screen query: filter on solved, newest first.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_problems_solved_id "
+        "ON problems(solved, id DESC, name, grp)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_problems_grp_solved ON problems(grp, solved)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_problems_url ON problems(url)")
+    conn.execute("ANALYZE problems")
+
+
+def _create_note_revisions(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS note_revisions (
+            slug TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            base_rev INTEGER,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (slug, rev)
+        )
+        """
+    )
+
+
+def _add_judge_limits(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(problems)")}
+    if "time_limit" not in columns:
+        conn.execute("ALTER TABLE problems ADD COLUMN time_limit INTEGER DEFAULT 0")
+    if "memory_limit" not in columns:
+        conn.execute("ALTER TABLE problems ADD COLUMN memory_limit INTEGER DEFAULT 0")
+
+
+def _create_problem_tests(conn: sqlite3.Connection) -> None:
+    # Test data lives in the BlobStore; rows only hold content hashes.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS problem_tests (
+            slug TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            input_hash TEXT NOT NULL,
+            output_hash TEXT NOT NULL,
+            PRIMARY KEY (slug, idx)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _create_sessions(conn: sqlite3.Connection) -> None:
+    # One row per timing session: started_at is wall-clock time (for reports),
+    # duration is measured with a monotonic clock. Legacy time_spent totals
+    # become a session with no start time.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            slug TEXT NOT NULL,
+            started_at REAL,
+            duration REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_slug ON sessions(slug, started_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions(started_at)")
+    conn.execute(
+        "INSERT INTO sessions (slug, started_at, duration) "
+        "SELECT slug, NULL, time_spent FROM problems WHERE time_spent > 0"
+    )
+
+
+def _unique_urls(conn: sqlite3.Connection) -> None:
+    # Problems are identified by URL from now on. Empty URLs become NULL
+    # (never equal under UNIQUE). For URLs saved more than once, the oldest
+    # row keeps it and the others move it to legacy_url: it stays readable
+    # (Open URL uses it), but only the oldest row is matched on re-send.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(problems)")}
+    if "legacy_url" not in columns:
+        conn.execute("ALTER TABLE problems ADD COLUMN legacy_url TEXT")
+    conn.execute("UPDATE problems SET url = NULL WHERE url = ''")
+    duplicates = conn.execute(
+        "UPDATE problems SET legacy_url = url, url = NULL WHERE url IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM problems WHERE url IS NOT NULL GROUP BY url) RETURNING slug, legacy_url"
+    ).fetchall()
+    for slug, url in duplicates:
+        logger.warning(f"{slug} has the same URL as an older problem; moved it to legacy_url: {url}")
+    conn.execute("DROP INDEX IF EXISTS idx_problems_url")
+    conn.execute("CREATE UNIQUE INDEX idx_problems_url ON problems(url)")
+
+
+# Adds or removes one problem's share of its group's totals. Time comes
+# from the problem's sessions, found through idx_sessions_slug.
+_STATS_ADD = """
+    INSERT INTO group_stats (grp, total, solved, time_spent)
+    VALUES (IFNULL({row}.grp, ''), 1, IFNULL({row}.solved, 0) != 0,
+            (SELECT IFNULL(SUM(duration), 0) FROM sessions WHERE slug = {row}.slug))
+    ON CONFLICT (grp) DO UPDATE SET
+        total = total + excluded.total,
+        solved = solved + excluded.solved,
+        time_spent = time_spent + excluded.time_spent;
+"""
+_STATS_REMOVE = """
+    UPDATE group_stats SET
+        total = total - 1,
+        solved = solved - (IFNULL({row}.solved, 0) != 0),
+        time_spent = time_spent - (SELECT IFNULL(SUM(duration), 0) FROM sessions WHERE slug = {row}.slug)
+    WHERE grp = IFNULL({row}.grp, '');
+    DELETE FROM group_stats WHERE grp = IFNULL({row}.grp, '') AND total <= 0;
+"""
+_SESSION_GROUP = "(SELECT IFNULL(grp, '') FROM problems WHERE slug = {row}.slug)"
+
+GROUP_STATS_TRIGGERS = {
+    "group_stats_problem_ai": f"AFTER INSERT ON problems BEGIN {_STATS_ADD.format(row='new')} END",
+    "group_stats_problem_ad": f"AFTER DELETE ON problems BEGIN {_STATS_REMOVE.format(row='old')} END",
+    "group_stats_problem_au": (
+        "AFTER UPDATE OF grp, solved, slug ON problems BEGIN "
+        f"{_STATS_REMOVE.format(row='old')} {_STATS_ADD.format(row='new')} END"
+    ),
+    "group_stats_session_ai": (
+        "AFTER INSERT ON sessions BEGIN "
+        "UPDATE group_stats SET time_spent = time_spent + new.duration "
+        f"WHERE grp = {_SESSION_GROUP.format(row='new')}; END"
+    ),
+    "group_stats_session_ad": (
+        "AFTER DELETE ON sessions BEGIN "
+        "UPDATE group_stats SET time_spent = time_spent - old.duration "
+        f"WHERE grp = {_SESSION_GROUP.format(row='old')}; END"
+    ),
+    "group_stats_session_au": (
+        "AFTER UPDATE OF slug, duration ON sessions BEGIN "
+        "UPDATE group_stats SET time_spent = time_spent - old.duration "
+        f"WHERE grp = {_SESSION_GROUP.format(row='old')}; "
+        "UPDATE group_stats SET time_spent = time_spent + new.duration "
+        f"WHERE grp = {_SESSION_GROUP.format(row='new')}; END"
+    ),
+}
+
+
+def rebuild_group_stats(conn: sqlite3.Connection) -> None:
+    """Recompute ``group_stats`` from scratch (one pass over problems and sessions)."""
+    conn.execute("DELETE FROM group_stats")
+    conn.execute(
+        """
+        INSERT INTO group_stats (grp, total, solved, time_spent)
+        SELECT IFNULL(p.grp, ''), COUNT(*), SUM(IFNULL(p.solved, 0) != 0), IFNULL(SUM(t.seconds), 0)
+        FROM problems p
+        LEFT JOIN (SELECT slug, SUM(duration) AS seconds FROM sessions GROUP BY slug) t ON t.slug = p.slug
+        GROUP BY 1
+        """
+    )
+
+
+def _create_group_stats(conn: sqlite3.Connection) -> None:
+    # Per-group counts and time, kept current by triggers so dashboards
+    # read one row per group instead of aggregating every problem. Problems
+    # without a group are counted under ''.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS group_stats (
+            grp TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            solved INTEGER NOT NULL DEFAULT 0,
+            time_spent REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    for name, body in GROUP_STATS_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    rebuild_group_stats(conn)
+
+
+# Ordered list of (version, description, step). A database at
+# ``PRAGMA user_version = n`` has had every step with version <= n applied.
+# Append new steps; never edit or renumber one that has shipped.
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "create problems table", _create_problems),
+    (2, "full-text search index", _create_search_index),
+    (3, "secondary indexes for list queries", _create_hot_indexes),
+    (4, "note revision history", _create_note_revisions),
+    (5, "time and memory limits for the local judge", _add_judge_limits),
+    (6, "content-addressed sample tests", _create_problem_tests),
+    (7, "session-based time tracking", _create_sessions),
+    (8, "problems identified by URL", _unique_urls),
+    (9, "per-group statistics", _create_group_stats),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply every pending migration on ``conn`` and return the new version.
+
+    The caller owns the transaction, so a failing step leaves the schema
+    and ``user_version`` untouched.
+    """
+    current = get_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this build supports ({SCHEMA_VERSION})"
+        )
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        step(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        current = version
+    return current
+
+
+def defer_problem_schema(conn: sqlite3.Connection) -> list[str]:
+    """
+    Drop the secondary indexes on ``problems``, its full-text triggers and
+    the ``group_stats`` triggers ahead of a bulk load and return their
+    names. UNIQUE indexes stay: they are constraints, and upserts need
+    them. The DDL is parked in
+    ``deferred_schema`` in the same transaction, so ``restore_deferred_schema``
+    can put it back even if the load dies half-way.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS deferred_schema (name TEXT PRIMARY KEY, type TEXT, sql TEXT)")
+    rows = conn.execute(
+        "SELECT name, type, sql FROM sqlite_master WHERE sql IS NOT NULL "
+        "AND ((tbl_name = 'problems' AND type = 'index' AND sql NOT LIKE 'CREATE UNIQUE%') "
+        "OR (tbl_name = 'problems' AND type = 'trigger' AND name LIKE 'problems_fts_%') "
+        "OR (type = 'trigger' AND name LIKE 'group_stats_%'))"
+    ).fetchall()
+    conn.executemany("INSERT OR REPLACE INTO deferred_schema (name, type, sql) VALUES (?, ?, ?)", rows)
+    for name, kind, _ in rows:
+        conn.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+    return [name for name, _, _ in rows]
+
+
+def resync_search_index(conn: sqlite3.Connection) -> None:
+    """
+    Bring the name and group columns of ``problems_fts`` back in line with
+    ``problems``: add missing rows, drop orphans, fix changed ones. Note
+    bodies of existing rows are left alone.
+    """
+    conn.execute("DELETE FROM problems_fts WHERE rowid NOT IN (SELECT id FROM problems)")
+    conn.execute(
+        "UPDATE problems_fts SET name = p.name, grp = p.grp FROM problems p "
+        "WHERE p.id = problems_fts.rowid AND (problems_fts.name IS NOT p.name OR problems_fts.grp IS NOT p.grp)"
+    )
+    conn.execute(
+        "INSERT INTO problems_fts (rowid, name, grp, body) "
+        "SELECT id, name, grp, '' FROM problems WHERE id NOT IN (SELECT rowid FROM problems_fts)"
+    )
+
+
+def restore_deferred_schema(conn: sqlite3.Connection) -> list[str]:
+    """
+    Recreate whatever ``defer_problem_schema`` dropped and return the names.
+    Other processes (the ingest daemon) may have written while the triggers
+    were gone, so the search index is resynced and ``group_stats`` rebuilt.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'deferred_schema'"
+    ).fetchone()
+    if not exists:
+        return []
+    rows = conn.execute("SELECT name, sql FROM deferred_schema").fetchall()
+    for name, sql in rows:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone():
+            conn.execute(sql)
+    conn.execute("DROP TABLE deferred_schema")
+    if any(name.startswith("problems_fts_") for name, _ in rows):
+        resync_search_index(conn)
+    if any(name.startswith("group_stats_") for name, _ in rows):
+        rebuild_group_stats(conn)
+    if rows:
+        conn.execute("ANALYZE problems")
+        logger.info(f"Restored {len(rows)} deferred indexes and triggers")
+    return [name for name, _ in rows]
+
+
+def full_scans(plan: list[tuple]) -> list[str]:
+    """
+    Return the EXPLAIN QUERY PLAN details that indicate a regression: a
+    table scan of ``problems`` that uses no index, or a temporary B-tree
+    built to satisfy ORDER BY.
+    """
+    bad = []
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith("SCAN problems") and "USING" not in detail:
+            bad.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            bad.append(detail)
+    return bad
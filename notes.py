@@ -0,0 +1,118 @@
+# notes.py
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@metrics.timed("notes.write")
+def atomic_write_text(path: Path, content: str) -> None:
+    """
+    Write ``content`` to ``path`` via a temp file in the same directory and
+    a rename, so a crash leaves either the old or the new file, never a
+    truncated one.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _digest(content: str) -> str:
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class NoteWriter:
+    """
+    Write-behind buffer for note files.
+
+    ``submit`` only records the latest content for a path and returns; a
+    single worker thread writes it atomically. Submissions that pile up
+    while a write is queued collapse into one write of the newest text, and
+    content whose hash matches what was last written is skipped.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="note-writer")
+        self._lock = threading.Lock()
+        self._pending: dict[Path, tuple[str, Optional[Callable[[str], None]]]] = {}
+        self._written: dict[Path, str] = {}
+
+    def remember(self, path: Path, content: str) -> None:
+        """Record ``content`` as already on disk, e.g. right after loading it."""
+        with self._lock:
+            self._written[path] = _digest(content)
+
+    def submit(self, path: Path, content: str,
+               on_written: Optional[Callable[[str], None]] = None) -> Optional[Future]:
+        """
+        Queue ``content`` for ``path``. ``on_written`` runs on the worker
+        thread with the content once it actually hit the disk.
+        """
+        with self._lock:
+            queued = path in self._pending
+            self._pending[path] = (content, on_written)
+        if queued:
+            return None
+        return self._executor.submit(self._flush_one, path)
+
+    def _flush_one(self, path: Path) -> bool:
+        with self._lock:
+            item = self._pending.pop(path, None)
+        if item is None:
+            return False  # Superseded by delete().
+        content, on_written = item
+        digest = _digest(content)
+        if self._written.get(path) == digest:
+            return False
+        try:
+            atomic_write_text(path, content)
+        except OSError as e:
+            logger.error(f"Failed to write {path}: {e}")
+            return False
+        with self._lock:
+            self._written[path] = digest
+        logger.info(f"Saved {path} ({len(content)} chars)")
+        if on_written is not None:
+            try:
+                on_written(content)
+            except Exception as e:
+                logger.error(f"Error after writing {path}: {e!r}")
+        return True
+
+    def delete(self, path: Path) -> Future:
+        """Drop any queued content for ``path`` and delete the file on the worker."""
+        with self._lock:
+            self._pending.pop(path, None)
+            self._written.pop(path, None)
+        return self._executor.submit(self._unlink, path)
+
+    def _unlink(self, path: Path) -> bool:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        logger.info(f"Deleted {path}")
+        return True
+
+    def close(self) -> None:
+        """Flush everything queued and stop the worker."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,30 @@
+# palette.py
+from functools import partial
+
+from textual.command import Hit, Hits, Provider
+
+from finder import WORD_BONUS
+
+
+class ProblemFinderProvider(Provider):
+    """Command palette entries that open problems, ranked by the app's FuzzyIndex."""
+
+    LIMIT = 20
+
+    async def startup(self) -> None:
+        # Searches use the current index until a rebuild replaces it.
+        self.app.refresh_finder()
+
+    async def search(self, query: str) -> Hits:
+        finder = self.app.finder
+        if finder is None:
+            return  # Still being built in the background.
+        matcher = self.matcher(query)
+        for hit in finder.search(query, self.LIMIT):
+            yield Hit(
+                # The palette expects scores in [0, 1].
+                min(hit.score / (1 + WORD_BONUS), 1.0),
+                matcher.highlight(hit.label),
+                partial(self.app.open_problem, hit.problem_id),
+                help="Open problem",
+            )
@@ -0,0 +1,196 @@
+# revisions.py
+import difflib
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple
+
+from database import ProblemDatabase
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FULL = "full"
+DELTA = "delta"
+
+
+class Revision(NamedTuple):
+    rev: int
+    kind: str
+    size: int
+    created_at: float
+
+
+def make_delta(base: str, target: str) -> list:
+    """
+    Encode ``target`` as line operations against ``base``: ``[i, j]`` copies
+    base lines i..j, a list of strings inserts those lines.
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append({"+": target_lines[j1:j2]})
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    base_lines = base.splitlines(keepends=True)
+    out = []
+    for op in ops:
+        if isinstance(op, dict):
+            out.extend(op["+"])
+        else:
+            out.extend(base_lines[op[0]:op[1]])
+    return "".join(out)
+
+
+class RevisionStore:
+    """
+    Every saved version of each note, stored in ``note_revisions``.
+
+    A revision is either a zlib-compressed full snapshot or a compressed
+    line delta against the most recent snapshot, so reading any version
+    costs one snapshot plus at most one delta. A new snapshot is taken every
+    ``snapshot_every`` revisions, or earlier once the delta would be more
+    than half the size of a snapshot. Every ``prune_every`` revisions the
+    history of that note is thinned with ``prune``.
+    """
+
+    def __init__(self, database: ProblemDatabase, *, snapshot_every: int = 32,
+                 prune_every: int = 64, cache_size: int = 16):
+        self.database = database
+        self.snapshot_every = snapshot_every
+        self.prune_every = prune_every
+        self.cache_size = cache_size
+        # slug -> (latest rev, its text, snapshot rev, snapshot text)
+        self._latest: "OrderedDict[str, tuple[int, str, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @metrics.timed("revisions.save")
+    def save(self, slug: str, content: str) -> int | None:
+        """Record ``content`` as the next revision; returns None if unchanged."""
+        with self._lock:
+            latest = self._head(slug)
+            if latest is not None and latest[1] == content:
+                return None
+            rev = latest[0] + 1 if latest else 1
+            full = zlib.compress(content.encode("utf-8"), 6)
+            kind, base_rev, data = FULL, None, full
+            if latest is not None and (rev - latest[2]) < self.snapshot_every:
+                delta = zlib.compress(
+                    json.dumps(make_delta(latest[3], content), separators=(",", ":")).encode("utf-8"), 6
+                )
+                if len(delta) * 2 < len(full):
+                    kind, base_rev, data = DELTA, latest[2], delta
+            with self.database.writer() as conn:
+                conn.execute(
+                    "INSERT INTO note_revisions (slug, rev, kind, base_rev, data, size, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (slug, rev, kind, base_rev, data, len(data), time.time())
+                )
+            if kind == FULL:
+                self._remember(slug, (rev, content, rev, content))
+            else:
+                self._remember(slug, (rev, content, latest[2], latest[3]))
+            logger.debug(f"Saved {kind} revision {rev} of {slug} ({len(data)} bytes)")
+        if self.prune_every and rev % self.prune_every == 0:
+            self.prune(slug)
+        return rev
+
+    def history(self, slug: str) -> list[Revision]:
+        with self.database.reader() as conn:
+            rows = conn.execute(
+                "SELECT rev, kind, size, created_at FROM note_revisions WHERE slug = ? ORDER BY rev DESC",
+                (slug,)
+            ).fetchall()
+        return [Revision(*row) for row in rows]
+
+    def get(self, slug: str, rev: int | None = None) -> str | None:
+        """Return the text of revision ``rev`` (the latest when None)."""
+        with self.database.reader() as conn:
+            if rev is None:
+                row = conn.execute(
+                    "SELECT rev, kind, base_rev, data FROM note_revisions WHERE slug = ? ORDER BY rev DESC LIMIT 1",
+                    (slug,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT rev, kind, base_rev, data FROM note_revisions WHERE slug = ? AND rev = ?",
+                    (slug, rev)
+                ).fetchone()
+            if row is None:
+                return None
+            _, kind, base_rev, data = row
+            if kind == FULL:
+                return zlib.decompress(data).decode("utf-8")
+            base = conn.execute(
+                "SELECT data FROM note_revisions WHERE slug = ? AND rev = ?",
+                (slug, base_rev)
+            ).fetchone()
+        snapshot = zlib.decompress(base[0]).decode("utf-8")
+        return apply_delta(snapshot, json.loads(zlib.decompress(data)))
+
+    def prune(self, slug: str, *, keep_last: int = 50, keep_daily_days: int = 30,
+              now: float | None = None) -> int:
+        """
+        Thin out old revisions and return how many were deleted.
+
+        The newest ``keep_last`` revisions are kept, plus the last revision
+        of each day for ``keep_daily_days`` days; anything older goes.
+        Snapshots still referenced by a kept delta are always kept.
+        """
+        now = time.time() if now is None else now
+        horizon = now - keep_daily_days * 86400
+        with self._lock, self.database.writer() as conn:
+            rows = conn.execute(
+                "SELECT rev, kind, base_rev, created_at FROM note_revisions WHERE slug = ? ORDER BY rev DESC",
+                (slug,)
+            ).fetchall()
+            keep = set()
+            days_seen = set()
+            for i, (rev, _, _, created_at) in enumerate(rows):
+                day = int(created_at // 86400)
+                if i < keep_last:
+                    keep.add(rev)
+                elif created_at >= horizon and day not in days_seen:
+                    keep.add(rev)
+                days_seen.add(day)
+            keep |= {base_rev for rev, kind, base_rev, _ in rows if rev in keep and kind == DELTA}
+            doomed = [(slug, rev) for rev, _, _, _ in rows if rev not in keep]
+            conn.executemany("DELETE FROM note_revisions WHERE slug = ? AND rev = ?", doomed)
+            self._latest.pop(slug, None)
+        if doomed:
+            logger.info(f"Pruned {len(doomed)} revisions of {slug}")
+        return len(doomed)
+
+    def _head(self, slug: str) -> tuple[int, str, int, str] | None:
+        cached = self._latest.get(slug)
+        if cached is not None:
+            self._latest.move_to_end(slug)
+            return cached
+        with self.database.reader() as conn:
+            row = conn.execute(
+                "SELECT rev, kind, base_rev FROM note_revisions WHERE slug = ? ORDER BY rev DESC LIMIT 1",
+                (slug,)
+            ).fetchone()
+        if row is None:
+            return None
+        rev, kind, base_rev = row
+        snapshot_rev = rev if kind == FULL else base_rev
+        head = (rev, self.get(slug, rev), snapshot_rev, self.get(slug, snapshot_rev))
+        self._remember(slug, head)
+        return head
+
+    def _remember(self, slug: str, head: tuple[int, str, int, str]) -> None:
+        self._latest[slug] = head
+        self._latest.move_to_end(slug)
+        while len(self._latest) > self.cache_size:
+            self._latest.popitem(last=False)
@@ -1,24 +1,51 @@
 # screens/detail_screen.py
 from textual.screen import Screen
 from textual.containers import Horizontal
-from textual.widgets import Button, Header, Label, Switch
-from textual import on
+from textual.widgets import Button, Collapsible, DataTable, Header, Input, Label, Switch, TextArea
+from textual import on, work
 from textual.timer import Timer
 from pathlib import Path
+import asyncio
+import functools
 import logging
+import time
 from NoteEditor import NoteEditor  # Import the NoteEditor widget
+from metrics import metrics
+from utils import format_duration
+
+def _on_note_written(database, revisions, slug: str, content: str):
+    """Runs on the note writer thread once a new version is on disk."""
+    try:
+        database.update_note_body(slug, content)
+    except Exception as e:
+        # A stale search index must not cost the revision history.
+        logging.error(f"Could not index the note for {slug}: {e}")
+    revisions.save(slug, content)
+
 
 class ProblemDetailScreen(Screen):
+    AUTOSAVE_DELAY = 1.0  # Seconds of idle typing before notes are saved
+    AUTOSAVE_MAX_DELAY = 5.0  # Upper bound on unsaved edits while typing continuously
+    TIMER_LABEL_REFRESH = 5.0  # Seconds between time label updates while visible
+    SESSION_CHECKPOINT = 60.0  # Seconds between saves of a running session
+
     def __init__(self, slug: str, name: str):
         super().__init__()
         self._slug = slug
         self._name = name
         self.note_file = Path("notes") / f"{slug}.md"
+        self.tests_dir = Path("tests") / slug
+        self._limits = (0, 0)  # (time_limit ms, memory_limit MB) from the judge payload
         self.save_note_on_solve = False
-        self._save_timer = None
-        self._time_spent_timer: Timer | None = None  # Timer for tracking time spent
-        self._elapsed_time = 0  # Track elapsed time locally
-        self._unsaved_time = 0  # Track time since the last database update
+        self._save_timer: Timer | None = None  # Debounce timer for note autosave
+        self._dirty_since: float | None = None
+        self._note_deleted = False
+        self._label_timer: Timer | None = None  # Repaints the time label while a session runs
+        self._checkpoint_timer: Timer | None = None  # Saves the running session periodically
+        self._session_started_at: float | None = None  # Wall-clock start of the running session
+        self._session_start: float | None = None  # time.monotonic() at the start of the session
+        self._recorded_time = 0  # Seconds from finished sessions
+        self._note_text: str | None = None  # Latest editor text, for saving after the DOM is gone
 
     def compose(self):
         yield Header()
@@ -35,36 +62,105 @@ class ProblemDetailScreen(Screen):
                 yield Switch(id="toggle-markdown", name="toggle-markdown", tooltip="toggle markdown view", value=False)
                 
         yield NoteEditor(id="note-editor")  # Use NoteEditor instead of TextArea
+        with Collapsible(title="Tests", id="judge-panel"):
+            with Horizontal(id="judge-controls"):
+                yield Input(placeholder="Solution file or command", id="solution-path")
+                yield Button(label="Run Tests", id="run-tests", variant="primary")
+                yield Label("", id="judge-summary")
+            yield DataTable(id="judge-results", cursor_type="row")
 
-    def on_mount(self):
+    async def on_mount(self):
         # Ensure notes folder exists
         self.note_file.parent.mkdir(parents=True, exist_ok=True)
         # Load notes into NoteEditor
         note_editor = self.query_one("#note-editor", NoteEditor)
         if self.note_file.exists():
-            content = self.note_file.read_text()
+            with metrics.timer("notes.read"):
+                content = self.note_file.read_text()
+            self.app.notes.remember(self.note_file, content)
             note_editor.update_content(content)
-        self.save_note_on_solve = bool(self.app.database.get_save_note_on_solve(self._slug))
+        # One cached row fetch; usually already warm from opening it in the list.
+        record = await self.app.adb.get_problem_full(self._slug)
+        self.save_note_on_solve = bool(record and record.save_note_on_solve)
         # Set the switch value to match database
         switch = self.query_one("#save-note-on-solve", Switch)
         switch.value = self.save_note_on_solve
-        # Load URL from database
-        url = self.app.database.get_url(self._slug)
+        url = record.url if record else None
         btn = self.query_one("#open-url", Button)
         btn.disabled = not bool(url)
         self._url = url
 
         # Load the initial time spent from the database
-        self._elapsed_time = self.app.database.get_time_spent(self._slug)
+        self._recorded_time = record.time_spent if record else 0
         self.update_timer_label()
         self.update_timer_buttons()
 
+        # Judge panel: limits from the payload and a default solution path
+        self._limits = (record.time_limit, record.memory_limit) if record else (0, 0)
+        table = self.query_one("#judge-results", DataTable)
+        table.add_columns("Test", "Verdict", "Time", "Memory", "Detail")
+        solutions = sorted(Path("solutions").glob(f"{self._slug}.*"))
+        if solutions:
+            self.query_one("#solution-path", Input).value = str(solutions[0])
+
+    @on(Button.Pressed, "#run-tests")
+    @on(Input.Submitted, "#solution-path")
+    def run_tests(self):
+        self._run_tests()
+
+    @work(exclusive=True, group="judge")
+    async def _run_tests(self):
+        """
+        Compile if needed, run the stored samples plus any tests in
+        tests/<slug>/ in parallel and fill the table.
+        """
+        from judge import (AC, DEFAULT_MEMORY_LIMIT_MB, DEFAULT_TIME_LIMIT_MS, CompileError,
+                           discover_tests, prepare_command, stored_tests)
+        table = self.query_one("#judge-results", DataTable)
+        summary = self.query_one("#judge-summary", Label)
+        table.clear()
+        solution = self.query_one("#solution-path", Input).value.strip()
+        if not solution:
+            summary.update("No solution given")
+            return
+        summary.update("Compiling...")
+        try:
+            command = await asyncio.to_thread(prepare_command, solution)
+        except (CompileError, OSError) as e:
+            summary.update("Compile error")
+            self.notify(str(e)[:500], title="Compile error", severity="error")
+            return
+        samples = stored_tests(self.app.blobs, await self.app.adb.get_problem_tests(self._slug))
+        cases = samples + await asyncio.to_thread(discover_tests, self.tests_dir)
+        if not cases:
+            summary.update(f"No samples and no tests in {self.tests_dir}")
+            return
+        time_limit = self._limits[0] or DEFAULT_TIME_LIMIT_MS
+        memory_limit = self._limits[1] or DEFAULT_MEMORY_LIMIT_MB
+        passed = 0
+        summary.update(f"Running {len(cases)} tests...")
+        async for result in self.app.judge.run(command, cases, time_limit, memory_limit):
+            passed += result.verdict == AC
+            table.add_row(result.name, result.verdict, f"{result.time_ms:.0f} ms",
+                          f"{result.memory_kb / 1024:.1f} MB", result.detail, key=result.name)
+        summary.update(f"{passed}/{len(cases)} passed")
+
+    @property
+    def _session_time(self) -> float:
+        if self._session_start is None:
+            return 0.0
+        return time.monotonic() - self._session_start
+
+    @property
+    def _elapsed_time(self) -> int:
+        return int(self._recorded_time + self._session_time)
+
     def update_timer_label(self):
         """
         Update the timer label with the current elapsed time.
         """
-        label = self.query_one("#timer-label", Label)
-        label.update(f"Time Spent: {self._elapsed_time}s")
+        text = format_duration(self._elapsed_time)
+        self.query_one("#timer-label", Label).update(f"Time Spent: {text}")
 
     def update_timer_buttons(self):
         """
@@ -74,7 +170,7 @@ class ProblemDetailScreen(Screen):
         stop_button = self.query_one("#stop-timer", Button)
         reset_button = self.query_one("#reset-timer", Button)
 
-        if self._time_spent_timer:  # Timer is running
+        if self._session_start is not None:  # Timer is running
             start_button.disabled = True
             stop_button.disabled = False
             reset_button.disabled = False
@@ -83,22 +179,24 @@ class ProblemDetailScreen(Screen):
             stop_button.disabled = True
             reset_button.disabled = self._elapsed_time == 0
 
-    def increment_time_spent(self):
-        """
-        Increment the time spent locally and update the label.
-        """
-        self._elapsed_time += 1
-        self._unsaved_time += 1
-        self.update_timer_label()
-
     def save_time_to_database(self):
         """
-        Save the unsaved time to the database.
+        Checkpoint the running session, if any, to the database.
         """
-        if self._unsaved_time > 0:
-            self.app.database.update_time_spent(self._slug, self._elapsed_time)
-            logging.info(f"Saved {self._elapsed_time}s to the database for {self._slug}.")
-            self._unsaved_time = 0
+        if self._session_start is not None:
+            duration = self._session_time
+            self.app.adb.record_session(self._slug, self._session_started_at, duration)
+            logging.info(f"Saved a {duration:.0f}s session for {self._slug}.")
+
+    def on_screen_suspend(self):
+        # Nobody can see the label while another screen is on top.
+        if self._label_timer:
+            self._label_timer.pause()
+
+    def on_screen_resume(self):
+        if self._label_timer:
+            self.update_timer_label()
+            self._label_timer.resume()
 
     @on(Switch.Changed, "#save-note-on-solve")
     def save_note_on_solve(self, switch: Switch):
@@ -108,10 +206,10 @@ class ProblemDetailScreen(Screen):
         self.save_note_on_solve = switch.value
         if switch.value:
             logging.info("Save note on solve is enabled.")
-            self.app.database.update_problem(self._slug, save_note_on_solve=1)
+            self.app.adb.update_problem(self._slug, save_note_on_solve=1)
         else:
             logging.info("Save note on solve is disabled.")
-            self.app.database.update_problem(self._slug, save_note_on_solve=0)
+            self.app.adb.update_problem(self._slug, save_note_on_solve=0)
  
     @on(Switch.Changed, '#toggle-markdown')
     def toggle_markdown(self, switch: Switch):
@@ -128,8 +226,11 @@ class ProblemDetailScreen(Screen):
         """
         Start the timer for tracking time spent.
         """
-        if not self._time_spent_timer:
-            self._time_spent_timer = self.set_interval(1, self.increment_time_spent)
+        if self._session_start is None:
+            self._session_started_at = time.time()
+            self._session_start = time.monotonic()
+            self._label_timer = self.set_interval(self.TIMER_LABEL_REFRESH, self.update_timer_label)
+            self._checkpoint_timer = self.set_interval(self.SESSION_CHECKPOINT, self.save_time_to_database)
             logging.info("Timer started.")
         self.update_timer_buttons()
 
@@ -138,44 +239,58 @@ class ProblemDetailScreen(Screen):
         """
         Stop the timer and save the time to the database.
         """
-        if self._time_spent_timer:
-            self._time_spent_timer.stop()
-            self._time_spent_timer = None
-            logging.info("Timer stopped.")
-        self.save_time_to_database()
+        self._end_session()
+        self.update_timer_label()
         self.update_timer_buttons()
 
+    def _end_session(self):
+        """Save the running session, fold it into the total and stop the timers."""
+        if self._session_start is None:
+            return
+        self.save_time_to_database()
+        self._recorded_time += self._session_time
+        self._session_start = self._session_started_at = None
+        for timer in (self._label_timer, self._checkpoint_timer):
+            if timer:
+                timer.stop()
+        self._label_timer = self._checkpoint_timer = None
+        logging.info("Timer stopped.")
+
     @on(Button.Pressed, "#reset-timer")
     def reset_timer(self):
         """
         Reset the timer for this problem.
         """
         self.stop_timer()
-        self._elapsed_time = 0
-        self._unsaved_time = 0
-        self.app.database.update_time_spent(self._slug, 0)
+        self._recorded_time = 0
+        self.app.adb.update_time_spent(self._slug, 0)
         self.update_timer_label()
         self.update_timer_buttons()
         logging.info("Timer reset.")
 
     @on(Button.Pressed, "#mark-as-solved")
     def mark_as_solved(self):
-        self.save_time_to_database()  # Save time before marking as solved
-        # Delete note file if save_note_on_solve is False
-        if not self.save_note_on_solve and self.note_file.exists():
-            try:
-                self.note_file.unlink()
-                logging.info(f"Note file {self.note_file} deleted as save_note_on_solve is False.")
-            except Exception as e:
-                logging.error(f"Failed to delete note file: {e}")
-        self.app.database.mark_solved(self._slug)  # This should set solved=1, not delete
+        self._end_session()  # Save time before marking as solved
+        # Delete note file if save_note_on_solve is False. Checked regardless
+        # of whether the file exists yet: an edit may still be queued.
+        if not self.save_note_on_solve:
+            self._cancel_autosave()
+            # The file goes away, but its last text is kept as a revision.
+            content = self.query_one("#note-editor", NoteEditor).get_content()
+            if content:
+                self.app.adb.run_write(self.app.revisions.save, self._slug, content)
+            self._note_deleted = True
+            self.app.notes.delete(self.note_file)
+            self.app.adb.update_note_body(self._slug, "")
+            logging.info(f"Note file {self.note_file} deleted as save_note_on_solve is False.")
+        self.app.adb.mark_solved(self._slug)  # This should set solved=1, not delete
         logging.info(f"Problem {self._slug} marked as solved in database")
         self.app.pop_screen()
 
     @on(Button.Pressed, "#back")
     def go_back(self):
         self.save_notes()
-        self.save_time_to_database()  # Save time before going back
+        self._end_session()  # Save time before going back
         self.app.pop_screen()
 
     @on(Button.Pressed, "#open-url")
@@ -184,20 +299,49 @@ class ProblemDetailScreen(Screen):
         if self._url:
             webbrowser.open(self._url)
 
+    @on(TextArea.Changed)
+    def schedule_autosave(self, event: TextArea.Changed):
+        """
+        Debounce note edits: save once typing pauses for AUTOSAVE_DELAY, or
+        at the latest AUTOSAVE_MAX_DELAY after the first unsaved edit.
+        """
+        self._note_text = event.text_area.text
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        if self._save_timer:
+            self._save_timer.stop()
+        delay = min(self.AUTOSAVE_DELAY, self._dirty_since + self.AUTOSAVE_MAX_DELAY - now)
+        self._save_timer = self.set_timer(max(delay, 0), self.save_notes)
+
+    def _cancel_autosave(self):
+        if self._save_timer:
+            self._save_timer.stop()
+            self._save_timer = None
+        self._dirty_since = None
+
     def save_notes(self):
-        # Ensure notes folder exists
-        self.note_file.parent.mkdir(parents=True, exist_ok=True)
-        note_editor = self.query_one("#note-editor", NoteEditor)
-        content = note_editor.get_content()
+        """Hand the current note to the write-behind buffer; the write happens off-thread."""
+        self._cancel_autosave()
+        if self._note_deleted:
+            return
+        editors = self.query("#note-editor")
+        # On unmount the children are already gone; fall back to the last text seen.
+        content = editors.first(NoteEditor).get_content() if editors else self._note_text
         if content:
-            self.note_file.write_text(content)
-            logging.info(f"Notes saved for {self._name}")
+            # Bound now: the callback may run during shutdown, when self.app
+            # is no longer reachable from the writer thread.
+            on_written = functools.partial(
+                _on_note_written, self.app.database, self.app.revisions, self._slug
+            )
+            self.app.notes.submit(self.note_file, content, on_written=on_written)
 
     def on_unmount(self):
-        # Stop the time spent timer
-        if self._time_spent_timer:
-            self._time_spent_timer.stop()
-            self._time_spent_timer = None
+        # Back and Mark As Solved have already saved; this catches quitting
+        # the app from here. Edits still waiting for the autosave timer are
+        # flushed from the cached text, since the editor is already pruned.
+        if self._dirty_since is not None:
+            self.save_notes()
 
-        # Save the unsaved time to the database
-        self.save_time_to_database()
+        # Save the running session, if any
+        self._end_session()
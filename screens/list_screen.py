@@ -1,19 +1,30 @@
 from textual.screen import Screen
+from textual.binding import Binding
 from textual.containers import Horizontal, Vertical
-from textual.widgets import Button, ListView, ListItem, Static, Header, SelectionList, Collapsible
+from textual.widgets import Button, Input, Static, Header, SelectionList, Collapsible, Tree
 from textual.widgets.selection_list import Selection
-from textual import on
+from textual.widgets.tree import TreeNode
+from textual import on, work
 from textual.reactive import reactive
+from rich.text import Text
 import logging
-from utils import sanitize
-from server import TCPServer
+from ProblemList import ProblemList
+from ingest import IngestQueue, RecentPayloads, Spool, prepare_rows
+from changes import DELETE, EXTERNAL, UPDATE, Change
+from metrics import metrics
+from utils import format_duration
 import asyncio
-from pathlib import Path
 logger = logging.getLogger(__name__)
 
 class ProblemListScreen(Screen):
+    PAGE_SIZE = 200
+    SEARCH_LIMIT = 200
+    BINDINGS = [Binding("ctrl+g", "toggle_grouped", "Group by contest")]
+    # Columns shown in (or filtered on by) the list; other updates are ignored.
+    LIST_COLUMNS = frozenset({"name", "grp", "solved"})
     stack_updates = reactive(0, repaint=False)
     filter_solved = reactive(["unsolved"])  # Default to "unsolved"
+    search_query = reactive("")
 
     def compose(self):
         yield Header()
@@ -27,15 +38,31 @@ class ProblemListScreen(Screen):
                         Selection("Unsolved", "unsolved", True),  # Default selected
                         id="solved-filter"
                     )
+                yield Input(placeholder="Search problems and notes", id="search")
                 yield Static("Problems", classes="title")
-                self.list_view = ListView(id="plist")
+                self.list_view = ProblemList(id="plist")
                 yield self.list_view
+                # Group-collapsed view: one node per group from group_stats,
+                # whose problems are loaded when it is expanded.
+                self.group_view = Tree("Groups", id="pgroups")
+                self.group_view.show_root = False
+                self.group_view.display = False
+                yield self.group_view
 
     def on_mount(self):
         self._server_running = False
-        self._tcp_server = TCPServer(callback=self._on_new_problem)
+        self._pages = None
+        self._ingest = IngestQueue(self._save_batch, spool=Spool(), recent=RecentPayloads())
+        self._ingest_ready = asyncio.create_task(self._ingest.start())
+        self._tcp_server = None  # Created on first start; server imports are deferred until then.
+        self._painted = False
+        self._grouped = False
+        self._group_nodes: dict[str, TreeNode] = {}
+        self._group_loaded: dict[str, int] = {}  # Rows loaded per expanded group
+        self._pending_changes: list[Change] = []
+        self._applying_changes = False
         self._refresh_list()
-        self.app.database.register_callback(self._on_database_update)
+        self._unsubscribe = self.app.database.subscribe(self._on_database_changes)
 
     @on(SelectionList.SelectedChanged, "#solved-filter")
     def on_solved_filter_changed(self):
@@ -44,39 +71,178 @@ class ProblemListScreen(Screen):
             self.filter_solved = selected
         else:
             self.filter_solved = None
-        self._refresh_list()
+        self._refresh_list(reset=True)
+
+    @on(Input.Changed, "#search")
+    def on_search_changed(self, event: Input.Changed):
+        self.search_query = event.value.strip()
+        self._refresh_list(reset=True)
 
     def watch_stack_updates(self) -> None:
         self._refresh_list()
 
-    def _refresh_list(self):
-        """Fetch problems and rebuild the ListView."""
-        logger.info("Loading problem list")
+    def action_toggle_grouped(self):
+        self._grouped = not self._grouped
+        self._refresh_list(reset=True)
+
+    def _current_filters(self) -> dict | None:
+        """Translate the solved filter into load_problems filters, or None for no rows."""
         filters = {}
         if self.filter_solved is None:
-            self.list_view.clear()
-            return
+            return None
         if len(self.filter_solved) > 1:
             pass
         elif self.filter_solved[0] == "solved":
             filters["solved"] = True
         elif self.filter_solved[0] == "unsolved":
             filters["solved"] = False
+        return filters
+
+    @work(exclusive=True, group="list-refresh")
+    async def _refresh_list(self, reset: bool = False):
+        """
+        Reload the rows already paged in (or just the first page when
+        ``reset``) and apply them to the list; only changed rows repaint.
+        Queries run off the event loop and a newer refresh cancels this one.
+        """
+        with metrics.timer("ui.refresh_list"):
+            await self._load_list(reset)
+        if not self._painted:
+            self._painted = True
+            self.call_after_refresh(self.app.first_paint_done)
+
+    async def _load_list(self, reset: bool) -> None:
+        logger.info("Loading problem list")
+        filters = self._current_filters()
+        # Search results are always shown flat.
+        show_groups = self._grouped and not self.search_query
+        self.list_view.display = not show_groups
+        self.group_view.display = show_groups
+        if filters is None:
+            self._pages = None
+            self.list_view.clear()
+            self._clear_groups()
+            return
+        if show_groups:
+            self._pages = None
+            await self._load_groups(filters, reset)
+            return
+        if self.search_query:
+            self._pages = None
+            items = await self.app.adb.search_problems(
+                self.search_query, filters, limit=self.SEARCH_LIMIT,
+                highlight=ProblemList.HIGHLIGHT,
+            )
+            self.list_view.set_rows(items)
+            return
+        limit = self.PAGE_SIZE if reset else max(self.list_view.row_count, self.PAGE_SIZE)
+        items = await self.app.adb.load_problems_page(filters, page_size=limit)
+        self.list_view.set_rows(items)
+        if len(items) < limit:
+            self._pages = None
+        else:
+            self._pages = self.app.database.iter_problem_pages(
+                filters, page_size=self.PAGE_SIZE, after_id=items[-1][0]
+            )
+        logger.debug(f"Problem list holds {len(items)} rows")
+
+    def _clear_groups(self) -> None:
+        self.group_view.clear()
+        self._group_nodes = {}
+        self._group_loaded = {}
+
+    async def _load_groups(self, filters: dict, reset: bool) -> None:
+        """
+        Show one node per group with problems matching ``filters``. The
+        counts come from group_stats, so this does not touch ``problems``;
+        groups that were expanded reload the rows they already showed.
+        """
+        stats = await self.app.adb.group_stats()
+        solved_filter = filters.get("solved")
+        visible = []
+        for grp, total, solved, seconds in stats:
+            shown = total if solved_filter is None else solved if solved_filter else total - solved
+            if shown:
+                label = Text(f"{grp or '(no group)'}  {solved}/{total} solved · {format_duration(seconds)}")
+                visible.append((grp, label))
+        expanded = set() if reset else {grp for grp, node in self._group_nodes.items() if node.is_expanded}
+        if reset or [grp for grp, _ in visible] != list(self._group_nodes):
+            self._clear_groups()
+            for grp, label in visible:
+                self._group_nodes[grp] = self.group_view.root.add(label, data=grp, allow_expand=True)
+            for grp in expanded & self._group_nodes.keys():
+                self._group_nodes[grp].expand()  # Reloads its rows via on_group_expanded
+            return
+        for grp, label in visible:
+            node = self._group_nodes[grp]
+            node.set_label(label)
+            if grp in expanded:
+                await self._load_group(node, reload=True)
+
+    async def _load_group(self, node: TreeNode, reload: bool = False) -> None:
+        grp = node.data
+        filters = self._current_filters()
+        if filters is None:
+            return
+        limit = max(self._group_loaded.get(grp, 0), self.PAGE_SIZE) if reload else self.PAGE_SIZE
+        rows = await self.app.adb.load_group_page(grp, filters, page_size=limit)
+        node.remove_children()
+        self._group_loaded[grp] = 0
+        self._add_group_rows(node, rows, limit)
 
-        items = self.app.database.load_problems(filters)
-        self.list_view.clear()
-        for pid, name, grp, solved in items:
-            mark = "✓" if solved else "✗"
-            content = f"{mark} {grp} / {name}"
-            card = Static(content, classes="card")
-            self.list_view.append(ListItem(card, name=str(pid)))
-            logger.debug(f"Added problem to list: {content}")
+    def _add_group_rows(self, node: TreeNode, rows: list[tuple], limit: int) -> None:
+        for row in rows:
+            node.add_leaf(Text(ProblemList.format_row(row)), data=row[0])
+        self._group_loaded[node.data] += len(rows)
+        if len(rows) == limit:
+            # Selecting this leaf fetches the next keyset page of the group.
+            node.add_leaf(Text("… more"), data=("more", rows[-1][0]))
+
+    @on(Tree.NodeExpanded, "#pgroups")
+    async def on_group_expanded(self, event: Tree.NodeExpanded):
+        node = event.node
+        if isinstance(node.data, str) and not node.children:
+            await self._load_group(node)
+
+    @on(Tree.NodeSelected, "#pgroups")
+    async def on_group_node_selected(self, event: Tree.NodeSelected):
+        node = event.node
+        if isinstance(node.data, int):
+            await self.app.open_problem(node.data)
+        elif isinstance(node.data, tuple):
+            group = node.parent
+            filters = self._current_filters()
+            if group is None or filters is None:
+                return
+            node.remove()
+            rows = await self.app.adb.load_group_page(
+                group.data, filters, page_size=self.PAGE_SIZE, after_id=node.data[1]
+            )
+            self._add_group_rows(group, rows, self.PAGE_SIZE)
+
+    @on(ProblemList.NearEnd)
+    async def load_next_page(self):
+        """Fetch the next keyset page when the list scrolls near its end."""
+        pages = self._pages
+        if pages is None:
+            return
+        page = await self.app.adb.run_read(next, pages, None)
+        if pages is not self._pages:
+            return  # The list was refreshed while this page was loading.
+        if page is None:
+            self._pages = None
+            return
+        with metrics.timer("ui.append_rows"):
+            self.list_view.append_rows(page)
 
     @on(Button.Pressed, "#toggle")
     def toggle_server(self):
         btn = self.query_one("#toggle", Button)
         if not self._server_running:
             logger.info("Starting TCP server...")
+            if self._tcp_server is None:
+                from server import TCPServer
+                self._tcp_server = TCPServer(callback=self._ingest.put)
             asyncio.create_task(self._tcp_server.start())
             btn.label = "Stop Server"
         else:
@@ -85,40 +251,88 @@ class ProblemListScreen(Screen):
             btn.label = "Start Server"
         self._server_running = not self._server_running
 
-    def _on_new_problem(self, data: dict):
-        """Handle incoming JSON, save it, and refresh."""
-        try:
-            name = data.get("name")
-            grp  = data.get("group")
-            url  = data.get("url")
-            slug = sanitize(name)
-            note_path = Path("notes") / f"{slug}.md"
-            note_path.parent.mkdir(parents=True, exist_ok=True)  # Ensure notes folder exists
-            note_path.write_text("")
-            self.app.database.save_problem(name, grp, url, slug, solved=0, note_path=str(note_path))
-        except Exception as e:
-            logger.error(f"Error saving problem: {e}")
-        self._refresh_list()
+    async def _save_batch(self, payloads: list[dict]):
+        """
+        Save a batch of incoming problems in one transaction. The database
+        callback then refreshes the list once for the whole batch. Errors
+        propagate so IngestQueue keeps the batch spooled for a retry.
+        """
+        rows = await asyncio.to_thread(prepare_rows, payloads, self.app.blobs)
+        await self.app.adb.save_problems(rows)
 
-    def _on_database_update(self):
-        """Callback when database changes externally."""
-        logger.info("Database updated, reloading problems...")
-        self._refresh_list()
+    def _on_database_changes(self, changes: list[Change]):
+        """Apply coalesced row deltas to the list without reloading it."""
+        self._pending_changes.extend(changes)
+        if not self._applying_changes:
+            self._applying_changes = True
+            self._apply_changes()
+
+    @work(group="list-changes")
+    async def _apply_changes(self):
+        """
+        The only consumer of queued changes: batches are applied one after
+        the other, so a slow read for one never lands after a later batch.
+        """
+        try:
+            while self._pending_changes:
+                changes, self._pending_changes = self._pending_changes, []
+                await self._apply_change_batch(changes)
+        finally:
+            self._applying_changes = False
 
-    @on(ListView.Selected)
-    def open_detail(self, event: ListView.Selected):
-        pid = int(event.item.name)
-        result = self.app.database.get_problem(pid)
-        if result:
-            slug, name, solved, save_note_on_solve = result  # Fetch additional fields
-            if solved and not save_note_on_solve:
-                # TODO: Inform the user that notes are not available 
-                pass
+    async def _apply_change_batch(self, changes: list[Change]):
+        if any(c.kind == EXTERNAL for c in changes):
+            # Another process (e.g. the ingest daemon) wrote rows we can't
+            # name; reloading the pages already shown is bounded by the list.
+            self._refresh_list()
+            return
+        relevant = [
+            c for c in changes
+            if c.kind != UPDATE or c.columns & self.LIST_COLUMNS
+            or (self.search_query and "body" in c.columns)
+            or (self._grouped and "time_spent" in c.columns)
+        ]
+        if not relevant:
+            return
+        filters = self._current_filters()
+        if filters is None:
+            return
+        if self.search_query or self._grouped:
+            # Search results are ranked, so positions can shift: re-run the
+            # query. Group counts are one summary row per group, and only
+            # expanded groups reload their rows.
+            self._refresh_list()
+            return
+        removed = set()
+        touched = set()
+        for change in relevant:
+            if change.kind == DELETE:
+                removed |= change.ids
             else:
-                # Open the detail screen
-                self.app.push_screen(self.app.SCREENS["detail"](slug, name))
+                touched |= change.ids
+        logger.info(f"Applying {len(touched)} changed and {len(removed)} removed problems")
+        metrics.count("ui.changes_applied", len(touched) + len(removed))
+        rows = await self.app.adb.load_problems_by_ids(touched, filters)
+        # Touched rows that no longer pass the filters leave the list too.
+        removed |= touched - {row[0] for row in rows}
+        self.list_view.apply_rows(rows, removed)
+
+    @on(ProblemList.Selected)
+    async def open_detail(self, event: ProblemList.Selected):
+        await self.app.open_problem(event.problem_id)
 
     def on_unmount(self):
+        self._unsubscribe()
         if self._server_running:
-            asyncio.create_task(self._tcp_server.stop())
-            self._server_running = False
\ No newline at end of file
+            self._server_running = False
+            asyncio.create_task(self._shutdown_ingest(self._tcp_server))
+        else:
+            asyncio.create_task(self._shutdown_ingest(None))
+
+    async def _shutdown_ingest(self, server):
+        # Best effort: anything still unsaved when the loop stops stays in the
+        # spool and is replayed on the next start.
+        if server is not None:
+            await server.stop()
+        await self._ingest_ready
+        await self._ingest.close()
\ No newline at end of file
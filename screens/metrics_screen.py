@@ -0,0 +1,74 @@
+# screens/metrics_screen.py
+import time
+from pathlib import Path
+
+from rich.table import Table
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Label, Static
+
+from metrics import metrics
+
+
+class MetricsScreen(ModalScreen):
+    """Overlay with live timers and counters from ``metrics``."""
+
+    REFRESH_INTERVAL = 1.0
+    BINDINGS = [
+        Binding("escape,f12", "dismiss", "Close"),
+        Binding("d", "dump", "Dump to file"),
+        Binding("p", "toggle_profile", "Start/stop profile"),
+        Binding("r", "reset", "Reset"),
+    ]
+
+    def compose(self):
+        with Vertical(id="metrics-panel"):
+            yield Label("", id="metrics-status")
+            yield Static(id="metrics-table")
+
+    def on_mount(self):
+        if not metrics.enabled:
+            # Collection starts when the panel is first opened.
+            metrics.enable()
+            metrics.reset()
+        self.update_stats()
+        self.set_interval(self.REFRESH_INTERVAL, self.update_stats)
+
+    def update_stats(self):
+        snapshot = metrics.snapshot()
+        table = Table(expand=True, box=None, pad_edge=False)
+        table.add_column("timer")
+        for column in ("count", "mean ms", "p50 ms", "p95 ms", "max ms"):
+            table.add_column(column, justify="right")
+        for name, stats in snapshot["timers"].items():
+            table.add_row(
+                name, str(stats["count"]), f"{stats['mean_ms']:.2f}", f"{stats['p50_ms']:.2f}",
+                f"{stats['p95_ms']:.2f}", f"{stats['max_ms']:.2f}",
+            )
+        if snapshot["counters"]:
+            table.add_section()
+            for name, value in snapshot["counters"].items():
+                table.add_row(name, str(value))
+        self.query_one("#metrics-table", Static).update(table)
+        status = f"Collecting for {snapshot['uptime_s']:.0f}s"
+        if metrics.profile_path is not None:
+            status += f" · profiling to {metrics.profile_path}"
+        self.query_one("#metrics-status", Label).update(status)
+
+    def action_dump(self):
+        path = Path(f"metrics-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        metrics.dump(path)
+        self.notify(f"Metrics written to {path}")
+
+    def action_toggle_profile(self):
+        if metrics.profile_path is None:
+            metrics.start_profile(f"profile-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            self.notify("Profiling the event loop; press p again to stop")
+        else:
+            self.notify(f"Profile written to {metrics.stop_profile()}")
+        self.update_stats()
+
+    def action_reset(self):
+        metrics.reset()
+        self.update_stats()
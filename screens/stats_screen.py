@@ -0,0 +1,64 @@
+# screens/stats_screen.py
+from textual import work
+from textual.binding import Binding
+from textual.screen import Screen
+from textual.widgets import DataTable, Header, Label
+
+from changes import Change
+from utils import format_duration
+
+
+class StatsScreen(Screen):
+    """Solved counts and time spent per contest group, from ``group_stats``."""
+
+    BINDINGS = [
+        Binding("escape,f2", "app.pop_screen", "Back"),
+        Binding("t", "sort_by_time", "Sort by time"),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self._by_time = False
+
+    def compose(self):
+        yield Header()
+        yield Label("", id="stats-summary")
+        yield DataTable(id="stats-table", cursor_type="row", zebra_stripes=True)
+
+    def on_mount(self):
+        table = self.query_one("#stats-table", DataTable)
+        table.add_column("Group", key="group")
+        for column in ("Solved", "Unsolved", "Total", "Time"):
+            table.add_column(column, key=column.lower())
+        self._load_stats()
+        self._unsubscribe = self.app.database.subscribe(self._on_database_changes)
+
+    def on_unmount(self):
+        self._unsubscribe()
+
+    def _on_database_changes(self, changes: list[Change]):
+        # One row per group, so reloading on every change batch stays cheap.
+        self._load_stats()
+
+    def action_sort_by_time(self):
+        self._by_time = not self._by_time
+        self._load_stats()
+
+    @work(exclusive=True, group="stats")
+    async def _load_stats(self):
+        stats = await self.app.adb.group_stats()
+        if self._by_time:
+            stats.sort(key=lambda row: row[3], reverse=True)
+        table = self.query_one("#stats-table", DataTable)
+        table.clear()
+        for grp, total, solved, seconds in stats:
+            table.add_row(
+                grp or "(no group)", str(solved), str(total - solved), str(total),
+                format_duration(seconds), key=grp,
+            )
+        total = sum(row[1] for row in stats)
+        solved = sum(row[2] for row in stats)
+        seconds = sum(row[3] for row in stats)
+        self.query_one("#stats-summary", Label).update(
+            f"{solved}/{total} solved in {len(stats)} groups · {format_duration(seconds)} tracked"
+        )
@@ -1,60 +1,248 @@
 import asyncio
 import json
 import logging
+from http import HTTPStatus
 from typing import Callable, Optional
 
+from metrics import metrics
+
+
+class HTTPError(Exception):
+    """Raised while reading a request; the status is sent back before closing."""
+
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
 class TCPServer:
     def __init__(self, host: str = "127.0.0.1", port: int = 27121,
                  callback: Optional[Callable[[dict], None]] = None,
-                 *, backlog: int = 100, recv_buffer: int = 4096):
+                 *, backlog: int = 100, recv_buffer: int = 4096,
+                 max_header_size: int = 16 * 1024, max_body_size: int = 16 * 1024 * 1024,
+                 keepalive_timeout: float = 15.0, request_timeout: float = 30.0):
         self.host = host
         self.port = port
         self.callback = callback
         self.backlog = backlog
         self.recv_buffer = recv_buffer
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.keepalive_timeout = keepalive_timeout
+        # Limit on reading one request once its first byte is in, so a client
+        # that stalls mid-request cannot hold the connection open.
+        self.request_timeout = request_timeout
         self._server: Optional[asyncio.AbstractServer] = None
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         addr = writer.get_extra_info("peername")
         logging.info(f"Connection from {addr}")
-        data = bytearray()
         try:
-            while not reader.at_eof():
-                chunk = await reader.read(self.recv_buffer)
-                if not chunk:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    start = await asyncio.wait_for(self._read_start(reader), self.keepalive_timeout)
+                except asyncio.TimeoutError:
                     break
-                data.extend(chunk)
-            text = data.decode(errors="ignore")
-            if "\r\n\r\n" in text:
-                _, body = text.split("\r\n\r\n", 1)
-            else:
-                body = text
-            payload = json.loads(body)
-            logging.info(f"Received JSON payload: {payload!r}")
-            if self.callback:
-                asyncio.create_task(self._run_callback(payload))
-        except json.JSONDecodeError as e:
-            logging.error(f"Invalid JSON from {addr}: {e}")
+                if not start:
+                    break
+                if start[-1:] in (b"{", b"["):
+                    # Bare JSON without HTTP framing (e.g. send_sample.py): body runs to
+                    # EOF. Decided on the first byte, since readline() is bounded by the
+                    # stream limit and a one-line payload can be far longer.
+                    try:
+                        data = await asyncio.wait_for(self._read_raw(start, reader, addr),
+                                                      self.request_timeout)
+                    except asyncio.TimeoutError:
+                        logging.error(f"Timed out reading a payload from {addr}")
+                        break
+                    if data is not None:
+                        await self._handle_raw(data, addr)
+                    break
+                try:
+                    method, keep_alive, body = await asyncio.wait_for(
+                        self._read_request(start, reader), self.request_timeout
+                    )
+                except HTTPError as e:
+                    logging.error(f"Bad request from {addr}: {e}")
+                    await self._respond(writer, e.status, keep_alive=False)
+                    break
+                except asyncio.TimeoutError:
+                    logging.error(f"Timed out reading a request from {addr}")
+                    await self._respond(writer, HTTPStatus.REQUEST_TIMEOUT, keep_alive=False)
+                    break
+                await self._handle_request(method, body, writer, addr, keep_alive)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logging.info(f"Client {addr} went away: {e}")
         except Exception as e:
             logging.error(f"Error handling {addr}: {e}")
         finally:
             writer.close()
-            await writer.wait_closed()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
             logging.info(f"Connection closed: {addr}")
 
-    async def _run_callback(self, payload: dict):
+    async def _read_start(self, reader: asyncio.StreamReader) -> bytes:
+        """Read up to and including the first non-whitespace byte; b"" at EOF."""
+        start = bytearray()
+        while True:
+            byte = await reader.read(1)
+            if not byte:
+                return b""
+            start += byte
+            if not byte.isspace():
+                return bytes(start)
+
+    async def _read_request(self, start: bytes, reader: asyncio.StreamReader) -> tuple[str, bool, bytes]:
+        """Read the rest of one HTTP request after ``start``; returns (method, keep-alive, body)."""
+        try:
+            request_line = start + await reader.readline()
+        except ValueError:
+            raise HTTPError(HTTPStatus.REQUEST_URI_TOO_LONG)
+        try:
+            method, _target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Malformed request line {request_line!r}")
+        if not version.startswith("HTTP/1."):
+            raise HTTPError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED)
+        headers = await self._read_headers(reader, len(request_line))
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            body = await self._read_chunked(reader)
+        else:
+            try:
+                length = int(headers.get("content-length", "0"))
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            if length < 0:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            if length > self.max_body_size:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            body = await reader.readexactly(length)
+        return method, keep_alive, body
+
+    async def _handle_request(self, method: str, body: bytes, writer: asyncio.StreamWriter,
+                              addr, keep_alive: bool) -> None:
+        """Dispatch one request's payload and reply."""
+        if method != "POST":
+            await self._respond(writer, HTTPStatus.METHOD_NOT_ALLOWED, keep_alive)
+            return
+        metrics.count("server.requests")
+        metrics.count("server.bytes_in", len(body))
+        try:
+            with metrics.timer("server.json_decode"):
+                payload = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logging.error(f"Invalid JSON from {addr}: {e}")
+            await self._respond(writer, HTTPStatus.BAD_REQUEST, keep_alive)
+            return
+        # The reply waits for the callback, so a callback that blocks (a full
+        # ingest queue) slows the client down instead of buffering without bound.
+        accepted = await self._dispatch(payload)
+        await self._respond(writer, HTTPStatus.OK if accepted else HTTPStatus.SERVICE_UNAVAILABLE, keep_alive)
+
+    async def _read_headers(self, reader: asyncio.StreamReader, used: int) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            used += len(line)
+            if used > self.max_header_size:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            if not line:
+                raise asyncio.IncompleteReadError(b"", None)
+            if line in (b"\r\n", b"\n"):
+                return headers
+            name, sep, value = line.decode("latin-1").partition(":")
+            if not sep:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Malformed header {line!r}")
+            headers[name.strip().lower()] = value.strip()
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        body = bytearray()
+        while True:
+            try:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid chunk size")
+            if size == 0:
+                # Skip trailers up to the terminating blank line.
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return bytes(body)
+            if len(body) + size > self.max_body_size:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            body.extend(await reader.readexactly(size))
+            await reader.readline()
+
+    async def _read_raw(self, first: bytes, reader: asyncio.StreamReader, addr) -> Optional[bytes]:
+        """Read a bare payload up to EOF; None if it is too large."""
+        data = bytearray(first)
+        while not reader.at_eof():
+            chunk = await reader.read(self.recv_buffer)
+            if not chunk:
+                break
+            data.extend(chunk)
+            if len(data) > self.max_body_size:
+                logging.error(f"Payload from {addr} exceeds {self.max_body_size} bytes")
+                return None
+        return bytes(data)
+
+    async def _handle_raw(self, data: bytes, addr) -> None:
+        metrics.count("server.requests")
+        metrics.count("server.bytes_in", len(data))
+        try:
+            with metrics.timer("server.json_decode"):
+                payload = json.loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logging.error(f"Invalid JSON from {addr}: {e}")
+            return
+        await self._dispatch(payload)
+
+    async def _dispatch(self, payload: dict) -> bool:
+        """Hand ``payload`` to the callback and wait for it; False if it failed."""
+        logging.info(f"Received JSON payload: {payload!r}")
+        if not self.callback:
+            return True
+        return await self._run_callback(payload)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: HTTPStatus, keep_alive: bool) -> None:
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+
+    async def _run_callback(self, payload: dict) -> bool:
         try:
             result = self.callback(payload)
             if asyncio.iscoroutine(result):
                 await result
         except Exception as e:
             logging.error(f"Error in callback: {e}")
+            return False
+        return True
 
     async def start(self):
         if self._server:
             return
         self._server = await asyncio.start_server(
-            self._handle_client, self.host, self.port, backlog=self.backlog
+            self._handle_client, self.host, self.port, backlog=self.backlog,
+            limit=max(self.max_header_size, self.recv_buffer),
         )
         addr = self._server.sockets[0].getsockname()
         logging.info(f"TCPServer listening on {addr}")
@@ -0,0 +1,88 @@
+# startup.py
+"""
+Measure time-to-interactive for ``python app.py --startup-profile``.
+
+Only the standard library is imported here, so the import hook can be
+installed before anything heavy is loaded.
+"""
+import builtins
+import sys
+import threading
+import time
+
+_profile: "StartupProfile | None" = None
+
+
+class StartupProfile:
+    """Records the cost of first-time imports and named milestones."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: list[tuple[str, float]] = []
+        self.imports: list[tuple[str, float]] = []
+        self._original_import = builtins.__import__
+        self._local = threading.local()
+
+    def install(self) -> None:
+        builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._original_import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                # Outermost imports only; their time includes everything they pull in.
+                self.imports.append((name, time.perf_counter() - start))
+
+    def mark(self, label: str) -> None:
+        self.marks.append((label, time.perf_counter()))
+
+    def report(self, top: int = 15) -> str:
+        lines = ["Startup profile", "", "Milestones (ms since start, ms since previous):"]
+        previous = self.started
+        for label, at in self.marks:
+            lines.append(f"  {label:32} {(at - self.started) * 1000:9.1f} {(at - previous) * 1000:9.1f}")
+            previous = at
+        total = sum(elapsed for _, elapsed in self.imports)
+        lines += ["", f"Slowest first-time imports (total {total * 1000:.1f} ms):"]
+        for name, elapsed in sorted(self.imports, key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"  {name:32} {elapsed * 1000:9.1f}")
+        return "\n".join(lines)
+
+
+def enable() -> StartupProfile:
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.install()
+    return _profile
+
+
+def enabled() -> bool:
+    return _profile is not None
+
+
+def mark(label: str) -> None:
+    if _profile is not None:
+        _profile.mark(label)
+
+
+def finish() -> str:
+    """Stop recording and return the report."""
+    global _profile
+    if _profile is None:
+        return ""
+    _profile.mark("done")
+    _profile.uninstall()
+    report = _profile.report()
+    _profile = None
+    return report
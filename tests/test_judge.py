@@ -0,0 +1,46 @@
+import asyncio
+import sys
+
+import pytest
+
+import judge
+from judge import AC, MLE, Judge
+
+ECHO = [sys.executable, "-c", "import sys; sys.stdout.write(sys.stdin.read())"]
+HOG = [sys.executable, "-c", "b = bytearray(200 * 1024 * 1024); b[::4096] = b'x' * len(b[::4096])"]
+
+
+def _run(command, case, memory_limit_mb):
+    async def run():
+        runner = Judge(workers=1)
+        try:
+            return [result async for result in runner.run(command, [case], 2000, memory_limit_mb)]
+        finally:
+            runner.close()
+    return asyncio.run(run())[0]
+
+
+@pytest.fixture
+def case(tmp_path):
+    (tmp_path / "1.in").write_text("1 2\n")
+    (tmp_path / "1.out").write_text("1 2\n")
+    return judge.TestCase("1", tmp_path / "1.in", tmp_path / "1.out")
+
+
+@pytest.fixture
+def large_heap():
+    heap = bytearray(300 * 1024 * 1024)
+    heap[::4096] = b"x" * len(heap[::4096])  # Touch every page so it is resident.
+    yield heap
+    del heap
+
+
+def test_memory_excludes_caller_heap(case, large_heap):
+    result = _run(ECHO, case, 256)
+    assert result.verdict == AC
+    assert result.memory_kb < 128 * 1024
+
+
+def test_memory_limit_still_enforced(case, large_heap):
+    result = _run(HOG, case, 128)
+    assert result.verdict == MLE
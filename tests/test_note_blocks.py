@@ -0,0 +1,40 @@
+import pytest
+from markdown_it import MarkdownIt
+
+from NoteEditor import split_blocks
+
+md = MarkdownIt("commonmark")
+
+
+def render_blocks(text: str) -> str:
+    return "".join(md.render(block) for block in split_blocks(text))
+
+
+@pytest.mark.parametrize("text", [
+    "# Title\n\nSome text.\n\n- a\n- b\n",
+    # Reference definition in another block.
+    "See [the editorial][ed] and [docs].\n\nMore text.\n\n[ed]: https://example.com/ed\n[docs]: https://example.com\n",
+    # Loose list: items separated by blank lines.
+    "- first\n\n- second\n\n- third\n\nAfter.\n",
+    "1. one\n\n2. two\n\n   continued\n\n3. three\n",
+    # Blank lines and fence-like lines inside fenced code.
+    "```cpp\nint main() {\n\n    return 0;\n\n}\n```\n\nText.\n",
+    "````\n```\nnot closed yet\n\n````\n\nAfter.\n",
+    "~~~\n```\n\n[x]: not-a-definition\n~~~\n\n[x] stays text.\n",
+])
+def test_blocks_render_like_whole_text(text):
+    assert render_blocks(text) == md.render(text)
+
+
+def test_loose_list_is_one_block():
+    assert split_blocks("- a\n\n- b\n\nPara.\n") == ["- a\n\n- b\n", "Para.\n"]
+
+
+def test_definitions_reach_every_block():
+    blocks = split_blocks("[a] here.\n\n[b] there.\n\n[a]: /a\n[b]: /b\n")
+    assert all(block.endswith("[a]: /a\n[b]: /b\n") for block in blocks)
+    assert "<a href=\"/b\">b</a>" in md.render(blocks[1])
+
+
+def test_fence_spans_blank_lines():
+    assert split_blocks("```\na\n\nb\n```\nc\n\nd\n") == ["```\na\n\nb\n```\nc\n", "d\n"]
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+from database import ProblemDatabase
+from migrations import _create_problems
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A database in the pre-migration schema, with a few hundred problems."""
+    path = tmp_path / "problems.db"
+    conn = sqlite3.connect(path)
+    _create_problems(conn)
+    conn.executemany(
+        "INSERT INTO problems (name, grp, url, slug, solved) VALUES (?, ?, ?, ?, ?)",
+        [(f"Problem {i}", f"Round {i // 8}", f"https://example.com/{i}", f"p{i}", i % 3 == 0)
+         for i in range(500)],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_migrated_database_has_no_plan_regressions(legacy_db):
+    database = ProblemDatabase(str(legacy_db), persistent=True)
+    database.init_db()
+    try:
+        assert database.check_query_plans() == {}
+    finally:
+        database.close()
+
+
+def test_missing_index_is_reported(legacy_db):
+    database = ProblemDatabase(str(legacy_db), persistent=True)
+    database.init_db()
+    try:
+        with database.writer() as conn:
+            conn.execute("DROP INDEX idx_problems_solved_id")
+            conn.execute("DROP INDEX idx_problems_grp_solved")
+        assert database.check_query_plans()
+    finally:
+        database.close()
@@ -1,8 +1,25 @@
 # utils.py
+import hashlib
+import re
+
+_SEPARATORS = str.maketrans({"/": "_", " ": "_"})
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+
 def sanitize(text: str) -> str:
-    import re
-    slug = text.strip().replace("/", "_").replace(" ", "_")
-    slug = re.sub(r"[^A-Za-z0-9_-]", "", slug)
-    if re.match(r"^[0-9]", slug):
+    slug = _UNSAFE.sub("", text.strip().translate(_SEPARATORS))
+    if slug[:1].isdigit():
         slug = f"id_{slug}"
     return slug
+
+
+def unique_slug(slug: str, url: str) -> str:
+    """Disambiguate ``slug`` for ``url`` when another problem already uses it."""
+    return f"{slug}_{hashlib.blake2b(url.encode(), digest_size=3).hexdigest()}"
+
+
+def format_duration(seconds: int) -> str:
+    """Render seconds as ``1h 05m`` or, under an hour, ``5m 09s``."""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"